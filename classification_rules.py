@@ -0,0 +1,260 @@
+"""
+Keyword classification rules shared by the MCP server (main.py), the Django
+serializer and the web agent.
+
+The rules live in classification_rules.json (override with
+HELPDESK_RULES_FILE). Every keyword of every rule is compiled into one
+KeywordMatcher, so a single scan of a description answers all of them:
+MCP category/subcategory, solution hints, the Django IT check and category,
+and the web agent's priority and intents.
+
+get_rules() returns the current RuleSet. When the file changes (checked at
+most every HELPDESK_RULES_CHECK_SECONDS) a new RuleSet is compiled and swapped
+in; callers holding the old one keep a consistent view. A file that fails to
+load leaves the previous rules in place.
+
+cached_hits() puts a bounded LRU/TTL memo in front of the scan, keyed by the
+lower-cased, whitespace-normalized text, since help-desk traffic repeats a lot.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from keyword_matcher import KeywordMatcher
+
+RULES_FILE = os.getenv(
+    "HELPDESK_RULES_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "classification_rules.json")
+)
+RULES_CHECK_SECONDS = float(os.getenv("HELPDESK_RULES_CHECK_SECONDS", "2"))
+# Classification memo: max entries (0 disables) and seconds an entry stays valid (0 = until evicted)
+CACHE_SIZE = int(os.getenv("HELPDESK_CLASSIFY_CACHE_SIZE", "4096"))
+CACHE_TTL_SECONDS = float(os.getenv("HELPDESK_CLASSIFY_CACHE_TTL", "3600"))
+
+Hits = FrozenSet[str]
+
+
+class RuleSet:
+    """One compiled rules file. Immutable; reload by building a new one."""
+
+    def __init__(self, data: Dict, source: str = ""):
+        self.source = source
+        self.version = data.get("version", 1)
+        groups: Dict[str, List[str]] = {}
+
+        mcp = data.get("mcp", {})
+        # (tag, category, [(tag, subcategory)], default subcategory)
+        self._mcp: List[Tuple[str, str, List[Tuple[str, str]], str]] = []
+        for i, rule in enumerate(mcp.get("categories", [])):
+            tag = f"mcp/{i}"
+            groups[tag] = rule["keywords"]
+            subs = []
+            for j, sub in enumerate(rule.get("subcategories", [])):
+                groups[f"{tag}/{j}"] = sub["keywords"]
+                subs.append((f"{tag}/{j}", sub["subcategory"]))
+            self._mcp.append((tag, rule["category"], subs, rule.get("default_subcategory", "general")))
+        self._mcp_default = tuple(mcp.get("default", ("software", "general")))
+        for name, keywords in mcp.get("solution_hints", {}).items():
+            groups[f"hint/{name}"] = keywords
+
+        django = data.get("django", {})
+        it_check = django.get("it_check", {})
+        groups["it/reject"] = it_check.get("reject", [])
+        groups["it/accept"] = it_check.get("accept", [])
+        self._django: List[Tuple[str, str]] = []
+        for i, rule in enumerate(django.get("categories", [])):
+            groups[f"django/{i}"] = rule["keywords"]
+            self._django.append((f"django/{i}", rule["category"]))
+        self._django_default = django.get("default_category", "hardware")
+
+        web = data.get("web_agent", {})
+        self._priorities: List[Tuple[str, str]] = []
+        for i, rule in enumerate(web.get("priorities", [])):
+            groups[f"priority/{i}"] = rule["keywords"]
+            self._priorities.append((f"priority/{i}", rule["priority"]))
+        self._default_priority = web.get("default_priority", "low")
+        for name, keywords in web.get("intents", {}).items():
+            groups[f"intent/{name}"] = keywords
+
+        self.matcher = KeywordMatcher(groups)
+
+    @classmethod
+    def from_file(cls, path: str) -> "RuleSet":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f), source=path)
+
+    def hits(self, text: str) -> Hits:
+        """Every rule group matched by `text`; pass the result to the methods below to avoid rescanning."""
+        return self.matcher.hits(text or "")
+
+    def hits_many(self, texts: Iterable[str]) -> List[Hits]:
+        """hits() for a batch of texts in one call (see KeywordMatcher.hits_many)."""
+        return self.matcher.hits_many(texts)
+
+    # MCP server
+    def classify(self, text: str, hits: Optional[Hits] = None) -> Tuple[str, str]:
+        if hits is None:
+            hits = self.hits(text)
+        for tag, category, subs, default_sub in self._mcp:
+            if tag in hits:
+                return category, next((sub for sub_tag, sub in subs if sub_tag in hits), default_sub)
+        return self._mcp_default[0], self._mcp_default[1]
+
+    @property
+    def mcp_default(self) -> Tuple[str, str]:
+        """What classify() answers when no category rule matches."""
+        return self._mcp_default[0], self._mcp_default[1]
+
+    def hint(self, name: str, hits: Hits) -> bool:
+        return f"hint/{name}" in hits
+
+    # Django serializer
+    def is_it_issue(self, text: str, hits: Optional[Hits] = None) -> bool:
+        if hits is None:
+            hits = self.hits(text)
+        return "it/reject" not in hits and "it/accept" in hits
+
+    def infer_category(self, text: str, hits: Optional[Hits] = None) -> str:
+        if hits is None:
+            hits = self.hits(text)
+        return next((category for tag, category in self._django if tag in hits), self._django_default)
+
+    # Web agent
+    def priority(self, text: str, hits: Optional[Hits] = None) -> str:
+        if hits is None:
+            hits = self.hits(text)
+        return next((priority for tag, priority in self._priorities if tag in hits), self._default_priority)
+
+    def intent(self, name: str, hits: Hits) -> bool:
+        return f"intent/{name}" in hits
+
+
+_lock = threading.Lock()
+_rules: Optional[RuleSet] = None
+_stamp: Optional[Tuple[int, int]] = None
+_checked = 0.0
+
+
+def _file_stamp(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def reload_rules(path: Optional[str] = None) -> RuleSet:
+    """Compile the rules file and swap it in. On error the current rules stay active (or the error is raised if there are none)."""
+    global _rules, _stamp, _checked
+    path = path or RULES_FILE
+    with _lock:
+        stamp = _file_stamp(path)
+        try:
+            rules = RuleSet.from_file(path)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            if _rules is None:
+                raise
+            print(f"[IT-HELPDESK] Keeping previous classification rules; {path} failed to load: {e}", file=sys.stderr)
+            rules = _rules
+        if rules is not _rules:
+            CACHE.clear()
+        _rules, _stamp, _checked = rules, stamp, time.monotonic()
+        return rules
+
+
+def get_rules() -> RuleSet:
+    """The active RuleSet, reloaded first if the rules file changed."""
+    global _checked
+    rules = _rules
+    if rules is None:
+        return reload_rules()
+    if time.monotonic() - _checked >= RULES_CHECK_SECONDS:
+        if _file_stamp(rules.source) != _stamp:
+            return reload_rules(rules.source)
+        _checked = time.monotonic()
+    return rules
+
+
+# -----------------------------
+# Classification memo
+# -----------------------------
+def normalize_text(text: str) -> str:
+    """Cache key: lower-cased like KeywordMatcher.hits, with runs of whitespace collapsed to one space."""
+    return " ".join((text or "").lower().split())
+
+
+class HitsCache:
+    """
+    Bounded LRU of normalized text -> rule hits, with an optional TTL.
+    Entries remember the RuleSet that produced them, so a rules reload never
+    serves stale hits. hits/misses/evictions are kept for sizing.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: "OrderedDict[str, Tuple[RuleSet, Hits, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str, rules: RuleSet) -> Optional[Hits]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] is rules and (not self.ttl or time.monotonic() - entry[2] < self.ttl):
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: str, rules: RuleSet, value: Hits) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._data[key] = (rules, value, time.monotonic())
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+CACHE = HitsCache(CACHE_SIZE, CACHE_TTL_SECONDS)
+
+
+def cached_hits(text: str) -> Hits:
+    """get_rules().hits() for the normalized text, memoized in CACHE."""
+    rules = get_rules()
+    key = normalize_text(text)
+    found = CACHE.get(key, rules)
+    if found is None:
+        found = rules.hits(key)
+        CACHE.put(key, rules, found)
+    return found
+
+
+def cache_stats() -> Dict[str, float]:
+    return CACHE.stats()
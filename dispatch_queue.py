@@ -0,0 +1,90 @@
+"""
+Priority dispatch queue for issues waiting for an expert ("queued").
+
+process_issues queues an issue when no available expert has room for it.
+DispatchQueue keeps those issues in a heap ordered by priority (urgent
+first) and then age, and drain() hands them out in that order for as long as
+the router can place the head. ExpertRouter.pick() falls back to any expert
+with room, so a head that cannot be placed means nobody has capacity left;
+draining stops there and strict priority order is kept.
+
+main.py drains it the moment capacity frees up (an assigned issue is closed
+or handed back), before each process_issues run, and on a periodic tick that
+also notices expert changes made in the Django DB.
+"""
+import heapq
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from expert_router import ExpertRouter
+from issue_store import Issue, IssueRecord
+
+QUEUED = "queued"
+PRIORITY_RANK = {"urgent": 0, "critical": 0, "high": 1, "medium": 2, "low": 3}
+
+
+def dispatch_key(issue: Issue) -> Tuple[int, str, str]:
+    """(priority rank, created_at, issue_id): "YYYY-MM-DD HH:MM:SS" stamps sort oldest first as text."""
+    rank = PRIORITY_RANK.get((issue.get("priority") or "").strip().lower(), 4)  # unknown priorities last
+    return rank, issue.get("created_at") or "", issue.get("issue_id") or ""
+
+
+class DispatchQueue:
+    def __init__(self):
+        self._heap: List[Tuple[int, str, str]] = []
+        self._queued: Set[str] = set()
+        # Held by main.dispatch_queued across drain + store write so two triggers cannot both place an issue
+        self.lock = threading.RLock()
+        self.dispatched = 0
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def push(self, issue: Issue) -> None:
+        issue_id = issue.get("issue_id") or ""
+        with self.lock:
+            if issue_id and issue_id not in self._queued:
+                self._queued.add(issue_id)
+                heapq.heappush(self._heap, dispatch_key(issue))
+
+    def load(self, issues: Iterable[Issue]) -> None:
+        """Merge in the store's queued issues (ids already pushed are kept once)."""
+        with self.lock:
+            for issue in issues:
+                self.push(issue)
+
+    def drain(self, router: ExpertRouter, fetch: Callable[[str], Optional[IssueRecord]]) -> List[Tuple[IssueRecord, Dict]]:
+        """
+        Pop issues in priority/age order while the router can place them and
+        return (issue, expert) pairs; each expert's load is bumped in the
+        router as it goes. The caller stores the assignments. Issues that are
+        no longer queued in the store (fetched fresh by id) are dropped.
+        """
+        placed: List[Tuple[IssueRecord, Dict]] = []
+        with self.lock:
+            while self._heap:
+                issue_id = self._heap[0][2]
+                issue = fetch(issue_id)
+                if issue is None or (issue.get("status") or "").lower() != QUEUED:
+                    heapq.heappop(self._heap)
+                    self._queued.discard(issue_id)
+                    continue
+                expert = router.pick(issue.get("category", ""), issue.get("subcategory", ""))
+                if expert is None:
+                    break
+                heapq.heappop(self._heap)
+                self._queued.discard(issue_id)
+                router.add_load(expert.get("id", ""))
+                placed.append((issue, expert))
+            self.dispatched += len(placed)
+        return placed
+
+    def stats(self) -> Dict[str, object]:
+        with self.lock:
+            head = self._heap[0] if self._heap else None
+            return {
+                "queued": len(self._heap),
+                "dispatched": self.dispatched,
+                "next_issue_id": head[2] if head else None,
+                "oldest_created_at": min((k[1] for k in self._heap), default=None),
+            }
@@ -12,12 +12,18 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 
 from pathlib import Path
 import os
+import sys
 from dotenv import load_dotenv
 from django.core.management.utils import get_random_secret_key
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Repo root (one level up) holds modules shared with the MCP server, e.g. issue_store.py
+REPO_DIR = BASE_DIR.parent
+if str(REPO_DIR) not in sys.path:
+    sys.path.insert(0, str(REPO_DIR))
+
 # Load environment variables from .env in project root
 load_dotenv(BASE_DIR / ".env", override=True)
 
@@ -100,6 +106,25 @@ DATABASES = {
 }
 
 
+# MCP issue file; its .seq sidecar is the shared ISSnnn counter for both stores
+PROBLEMS_FILE = os.getenv("PROBLEMS_FILE", str(REPO_DIR / "problems.txt"))
+
+# Persistent Gemini response cache (issues/llm_cache.py): TTL in seconds, LRU-evicted beyond MAX_ENTRIES
+GEMINI_CACHE_PATH = os.getenv("GEMINI_CACHE_PATH", str(BASE_DIR / "gemini_cache.sqlite3"))
+GEMINI_CACHE_TTL = float(os.getenv("GEMINI_CACHE_TTL", str(7 * 24 * 3600)))
+GEMINI_CACHE_MAX_ENTRIES = int(os.getenv("GEMINI_CACHE_MAX_ENTRIES", "10000"))
+
+# Accept-then-classify intake (issues/intake.py): POST /api/issues/ stores the ticket as
+# "pending_classification" and CLASSIFICATION_WORKERS background threads apply the Gemini verdict
+ASYNC_CLASSIFICATION = os.getenv("ISSUE_ASYNC_CLASSIFICATION", "0") == "1"
+CLASSIFICATION_WORKERS = int(os.getenv("ISSUE_CLASSIFICATION_WORKERS", "4"))
+
+# Offline classifier (issues/local_model.py, built by `manage.py train_issue_model`): predictions at
+# or above ISSUE_MODEL_MIN_CONFIDENCE skip Gemini, the rest escalate to it
+ISSUE_MODEL_PATH = os.getenv("ISSUE_MODEL_PATH", str(BASE_DIR / "issue_model.json"))
+ISSUE_MODEL_MIN_CONFIDENCE = float(os.getenv("ISSUE_MODEL_MIN_CONFIDENCE", "0.9"))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Offline speed/accuracy benchmark for the issue classifiers.
+
+Runs every classifier over the labelled TR/EN corpus (classification_corpus.json)
+and reports accuracy (overall and per language), throughput and per-call
+latency percentiles. No API key or network is needed: Gemini is replaced by a
+deterministic stub that answers from the corpus labels, so its rows measure our
+prompt/cache/guard/parse overhead (plus --gemini-latency-ms of simulated
+network time), not the model's judgement. The IssueSerializer.judge row also
+uses the offline model when one is trained (ISSUE_MODEL_PATH).
+
+    python django_api_service/classification_benchmark.py [--repeat 50] [--json results.json]
+
+Compare the output before and after a classifier change.
+"""
+import argparse
+import json
+import math
+import os
+import re
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional
+
+BASE_DIR = Path(__file__).resolve().parent
+REPO_DIR = BASE_DIR.parent
+for p in (str(BASE_DIR), str(REPO_DIR)):
+    if p not in sys.path:
+        sys.path.insert(0, p)
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "api.settings")
+# Keep the real response cache untouched and never shed stub calls
+os.environ["GEMINI_CACHE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="classify-bench-"), "gemini_cache.sqlite3")
+os.environ["GEMINI_RATE_PER_SEC"] = "0"
+
+import django  # noqa: E402
+
+django.setup()
+
+import classification_rules  # noqa: E402
+import main  # noqa: E402
+from issues import gemini, llm_cache  # noqa: E402
+from issues.serializers import IssueSerializer  # noqa: E402
+
+_MESSAGE_RE = re.compile(r'Message: "(.*)"\n')
+
+
+class StubGemini:
+    """Stands in for GenerativeModel: answers from the corpus labels after a fixed delay."""
+
+    def __init__(self, samples: List[Dict], latency_ms: float):
+        self.truth = {s["text"]: s["category"] for s in samples}
+        self.latency = latency_ms / 1000.0
+
+    def generate_content(self, prompt: str, generation_config=None):
+        match = _MESSAGE_RE.search(prompt)
+        text = match.group(1) if match else ""
+        if self.latency:
+            time.sleep(self.latency)
+        if text not in self.truth:
+            answer = {"verdict": "INSUFFICIENT_DETAIL", "category": "", "subcategory": ""}
+        elif self.truth[text] is None:
+            answer = {"verdict": "NOT_IT_ISSUE", "category": "", "subcategory": ""}
+        else:
+            answer = {"verdict": "VALID_IT_ISSUE", "category": self.truth[text], "subcategory": ""}
+        return SimpleNamespace(text=json.dumps(answer))
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def clear_memo() -> None:
+    classification_rules.CACHE.clear()
+
+
+def clear_gemini_cache() -> None:
+    clear_memo()
+    llm_cache.get_cache()._conn().execute("DELETE FROM responses")
+
+
+def expected_verdict(sample: Dict):
+    """What judge() should return for a sample: (accepted, category)."""
+    return sample["category"] is not None, sample["category"]
+
+
+def judged(result) -> tuple:
+    error, category, _, _ = result
+    return error is None, category if error is None else None
+
+
+BENCHMARKS = [
+    # name, function, which samples, is the answer right?, cache state:
+    # "memo" = keyword memo cleared before each call (unless --memo), "miss" = response cache
+    # cleared before each call, "hit" = response cache warmed before timing
+    ("mcp.ai_classify_issue", main.ai_classify_issue,
+     lambda s: s["category"] is not None, lambda s, out: out[0] == s["mcp"], "memo"),
+    ("django._local_it_check", IssueSerializer._local_it_check,
+     lambda s: True, lambda s, out: out == (s["category"] is not None), "memo"),
+    ("django._local_infer_category", IssueSerializer._local_infer_category,
+     lambda s: s["category"] is not None, lambda s, out: out == s["category"], "memo"),
+    ("gemini.analyze (stub, cache miss)", IssueSerializer.analyze_with_gemini,
+     lambda s: True, lambda s, out: (out[0] == "VALID_IT_ISSUE", out[2] or None) == expected_verdict(s), "miss"),
+    ("gemini.analyze (stub, cache hit)", IssueSerializer.analyze_with_gemini,
+     lambda s: True, lambda s, out: (out[0] == "VALID_IT_ISSUE", out[2] or None) == expected_verdict(s), "hit"),
+    ("IssueSerializer.judge", IssueSerializer.judge,
+     lambda s: True, lambda s, out: judged(out) == expected_verdict(s), "hit"),
+]
+
+
+def run(name: str, fn: Callable, samples: List[Dict], correct: Callable, setup: Optional[Callable], repeat: int) -> Dict:
+    latencies: List[float] = []
+    right = {"all": 0, "en": 0, "tr": 0}
+    total = {"all": 0, "en": 0, "tr": 0}
+    for r in range(repeat):
+        for s in samples:
+            if setup is not None:
+                setup()
+            started = time.perf_counter_ns()
+            out = fn(s["text"])
+            latencies.append((time.perf_counter_ns() - started) / 1000.0)
+            if r == 0:
+                ok = bool(correct(s, out))
+                for key in ("all", s["lang"]):
+                    total[key] += 1
+                    right[key] += ok
+    latencies.sort()
+    elapsed = sum(latencies) / 1e6
+    acc = {k: round(right[k] / total[k], 4) if total[k] else None for k in total}
+    return {
+        "name": name,
+        "samples": len(samples),
+        "calls": len(latencies),
+        "accuracy": acc["all"],
+        "accuracy_en": acc["en"],
+        "accuracy_tr": acc["tr"],
+        "calls_per_sec": round(len(latencies) / elapsed, 1) if elapsed else None,
+        "p50_us": round(percentile(latencies, 50), 1),
+        "p95_us": round(percentile(latencies, 95), 1),
+        "p99_us": round(percentile(latencies, 99), 1),
+    }
+
+
+def _pct(v: Optional[float]) -> str:
+    return "-" if v is None else f"{v:.1%}"
+
+
+def main_cli(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--corpus", default=str(BASE_DIR / "classification_corpus.json"))
+    parser.add_argument("--repeat", type=int, default=50, help="Timed passes over the corpus per classifier")
+    parser.add_argument("--gemini-latency-ms", type=float, default=0.0, help="Simulated network time per stub call")
+    parser.add_argument("--memo", action="store_true",
+                        help="Keep the keyword-hit memo warm between calls (default: cleared, i.e. cold per call)")
+    parser.add_argument("--only", default="", help="Run only classifiers whose name contains this")
+    parser.add_argument("--json", dest="json_path", help="Also write the results here")
+    args = parser.parse_args(argv)
+
+    with open(args.corpus, encoding="utf-8") as f:
+        corpus = json.load(f)["samples"]
+    stub = StubGemini(corpus, args.gemini_latency_ms)
+    gemini.get_model = lambda: stub
+
+    setups = {"memo": None if args.memo else clear_memo, "miss": clear_gemini_cache, "hit": None}
+    results = []
+    for name, fn, select, correct, state in BENCHMARKS:
+        if args.only and args.only not in name:
+            continue
+        samples = [s for s in corpus if select(s)]
+        if state == "hit":
+            for s in samples:
+                fn(s["text"])
+        results.append(run(name, fn, samples, correct, setups[state], max(1, args.repeat)))
+
+    header = f"{'classifier':36} {'n':>4} {'acc':>7} {'acc_en':>7} {'acc_tr':>7} {'calls/s':>10} {'p50 us':>9} {'p95 us':>9} {'p99 us':>9}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(
+            f"{r['name']:36} {r['samples']:>4} {_pct(r['accuracy']):>7} {_pct(r['accuracy_en']):>7} "
+            f"{_pct(r['accuracy_tr']):>7} {r['calls_per_sec'] or 0:>10.0f} {r['p50_us']:>9.1f} {r['p95_us']:>9.1f} {r['p99_us']:>9.1f}"
+        )
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"repeat": args.repeat, "memo": args.memo, "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -37,6 +37,8 @@ def main():
                 "contact": e.get("contact", ""),
                 "availability": bool(e.get("availability", True)),
                 "current_load": int(e.get("current_load", 0)),
+                "capacity": e.get("capacity"),
+                "weight": int(e.get("weight", 1)),
             },
         )
         imported += 1
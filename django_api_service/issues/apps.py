@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class IssuesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'issues'
+
+    def ready(self):
+        from django.conf import settings
+
+        if settings.ASYNC_CLASSIFICATION:
+            from . import intake
+
+            # Start the workers now so tickets a restart left pending do not wait for the next submission
+            intake.get_queue()
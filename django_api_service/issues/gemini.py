@@ -0,0 +1,251 @@
+"""
+Gemini access for the issues app.
+
+One GenerativeModel is created per process (re-created only if the API key
+or GEMINI_MODEL changes) instead of configuring the SDK and building a model
+on every call. Every response goes through the persistent response cache
+(llm_cache). analyze() asks for validity, category and subcategory in a
+single structured JSON response.
+
+Calls that actually reach Gemini pass a token bucket (GEMINI_RATE_PER_SEC,
+GEMINI_BURST) and a circuit breaker: after GEMINI_BREAKER_FAILURES
+consecutive errors the breaker opens and calls fail fast with
+GeminiUnavailable, so callers take their local path. After
+GEMINI_BREAKER_COOLDOWN seconds one probe call is let through (half-open);
+success closes the breaker, failure opens it again.
+"""
+import json
+import os
+import re
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+import google.generativeai as genai
+
+from . import llm_cache
+
+VERDICTS = ("VALID_IT_ISSUE", "NOT_IT_ISSUE", "INSUFFICIENT_DETAIL")
+
+
+class GeminiUnavailable(Exception):
+    """Gemini cannot be called (e.g. no API key configured)."""
+
+
+class TokenBucket:
+    """`rate` tokens per second, at most `burst` banked. try_take() never blocks."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self._tokens = self.burst
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_take(self) -> bool:
+        if self.rate <= 0:
+            return True  # unlimited
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+            self._stamp = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int, cooldown: float):
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """May a call go out now? In half-open only one probe is in flight at a time."""
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = self.HALF_OPEN
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def release(self) -> None:
+        """The allowed call never went out; free the half-open probe slot without a verdict."""
+        with self._lock:
+            self._probing = False
+
+    def record(self, ok: bool) -> None:
+        with self._lock:
+            self._probing = False
+            if ok:
+                self.state, self.failures = self.CLOSED, 0
+                return
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.times_opened += 1
+                self.state, self.opened_at = self.OPEN, time.monotonic()
+
+
+RATE_LIMITER = TokenBucket(float(os.getenv("GEMINI_RATE_PER_SEC", "5")), float(os.getenv("GEMINI_BURST", "10")))
+BREAKER = CircuitBreaker(int(os.getenv("GEMINI_BREAKER_FAILURES", "5")), float(os.getenv("GEMINI_BREAKER_COOLDOWN", "30")))
+_counts = {"calls": 0, "errors": 0, "shed_rate_limited": 0, "shed_breaker_open": 0}
+_counts_lock = threading.Lock()
+
+
+def _count(name: str) -> None:
+    with _counts_lock:
+        _counts[name] += 1
+
+
+def guarded_call(fn: Callable[[], str]) -> str:
+    """Run one Gemini request behind the breaker and rate limiter; raises GeminiUnavailable when shed."""
+    if not BREAKER.allow():
+        _count("shed_breaker_open")
+        raise GeminiUnavailable("circuit_open")
+    if not RATE_LIMITER.try_take():
+        BREAKER.release()
+        _count("shed_rate_limited")
+        raise GeminiUnavailable("rate_limited")
+    _count("calls")
+    try:
+        result = fn()
+    except Exception:
+        _count("errors")
+        BREAKER.record(False)
+        raise
+    BREAKER.record(True)
+    return result
+
+
+def guard_stats() -> Dict[str, object]:
+    with _counts_lock:
+        counts = dict(_counts)
+    counts.update(
+        breaker_state=BREAKER.state,
+        breaker_failures=BREAKER.failures,
+        breaker_times_opened=BREAKER.times_opened,
+        rate_per_sec=RATE_LIMITER.rate,
+    )
+    return counts
+
+
+_model = None
+_model_key: Optional[Tuple[str, str]] = None
+_model_lock = threading.Lock()
+
+
+def model_name() -> str:
+    return os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
+
+
+def get_model():
+    """The process-wide GenerativeModel (accepts GEMINI_API_KEY or GOOGLE_API_KEY)."""
+    global _model, _model_key
+    api_key = os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
+    if not api_key:
+        raise GeminiUnavailable("Missing API key")
+    key = (api_key, model_name())
+    with _model_lock:
+        if _model is None or _model_key != key:
+            genai.configure(api_key=api_key)
+            _model = genai.GenerativeModel(key[1])
+            _model_key = key
+        return _model
+
+
+def generate(
+    prompt: str,
+    accept: Callable[[str], bool],
+    cache_report: Optional[Dict[str, str]] = None,
+    name: str = "gemini",
+    generation_config: Optional[Dict] = None,
+) -> str:
+    """
+    Response text for `prompt`, served from the response cache when we have
+    seen it before. Only responses accepted by `accept` are cached. Records
+    "hit"/"miss" under cache_report[name].
+    """
+    def call() -> str:
+        model = get_model()  # no API key -> GeminiUnavailable before touching the breaker
+        response = guarded_call(lambda: model.generate_content(prompt, generation_config=generation_config))
+        return response.text or ""
+
+    text, hit = llm_cache.get_cache().generate(model_name(), prompt, call, accept)
+    if cache_report is not None:
+        cache_report[name] = "hit" if hit else "miss"
+    return text
+
+
+ANALYZE_PROMPT = """
+Analyze this user message for an IT support system.
+
+Message: "{description}"
+
+Decide whether it describes an IT/computer/device-related technical issue that should be logged:
+- VALID_IT_ISSUE: hardware (laptop, desktop, keyboard, mouse, monitor), software (applications, operating
+  systems, updates, installations), network (WiFi, VPN, internet, email), access (login, passwords, accounts),
+  peripherals (printers, scanners, webcams), mobile devices, security (antivirus, encryption, certificates)
+- NOT_IT_ISSUE: household problems, vehicles, greetings or small talk, non-technical personal problems,
+  facility maintenance (doors, windows, painting)
+- INSUFFICIENT_DETAIL: too vague to tell
+
+For VALID_IT_ISSUE also give the category, one of: {categories}
+and a short lowercase subcategory (one or two words, e.g. "vpn", "printer", "password").
+
+Respond with ONLY a JSON object:
+{{"verdict": "VALID_IT_ISSUE" | "NOT_IT_ISSUE" | "INSUFFICIENT_DETAIL", "category": "...", "subcategory": "..."}}
+"""
+
+_SUBCATEGORY_RE = re.compile(r"[^a-z0-9_]+")
+
+
+def parse_analysis(text: str, categories) -> Optional[Dict[str, str]]:
+    """The structured answer as {"verdict", "category", "subcategory"}, or None if it is not usable."""
+    try:
+        data = json.loads((text or "").strip())
+    except ValueError:
+        return None
+    if not isinstance(data, dict):
+        return None
+    verdict = str(data.get("verdict") or "").strip().upper()
+    if verdict not in VERDICTS:
+        return None
+    category = str(data.get("category") or "").strip().lower()
+    subcategory = _SUBCATEGORY_RE.sub("_", str(data.get("subcategory") or "").strip().lower()).strip("_")[:32]
+    return {
+        "verdict": verdict,
+        "category": category if category in categories else "",
+        "subcategory": subcategory,
+    }
+
+
+def analyze(description: str, categories, cache_report: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """
+    Validity, category and subcategory from one Gemini call with a JSON
+    response. Raises GeminiUnavailable or the SDK's error when Gemini cannot
+    answer, and ValueError when the answer is not the expected JSON.
+    """
+    prompt = ANALYZE_PROMPT.format(description=description, categories=", ".join(sorted(categories)))
+    text = generate(
+        prompt,
+        lambda t: parse_analysis(t, categories) is not None,
+        cache_report,
+        "analyze",
+        generation_config={"response_mime_type": "application/json"},
+    )
+    result = parse_analysis(text, categories)
+    if result is None:
+        raise ValueError(f"Unexpected model response: {text!r}")
+    return result
@@ -0,0 +1,134 @@
+"""
+Accept-then-classify intake (ISSUE_ASYNC_CLASSIFICATION=1).
+
+POST /api/issues/ stores the ticket right away with the local heuristic
+category (marked "category:local" in classification_note when the caller
+sent none) and status "pending_classification", then hands its pk to a small
+thread pool. A worker asks Gemini (with the local fallback, see
+IssueSerializer.judge) and moves the ticket to "open", or to "rejected" with
+the reason in classification_note. The queue starts with the app
+(IssuesConfig.ready) and re-queues tickets a restart left pending.
+"""
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .models import Issue
+
+PENDING = "pending_classification"
+REJECTED = "rejected"
+LOCAL_CATEGORY = "category:local"  # classification_note while the category is intake's local guess
+
+
+class ClassificationQueue:
+    def __init__(self, workers: int):
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="classify")
+        self._lock = threading.Lock()
+        self._started = False
+        self.submitted = 0
+        self.accepted = 0
+        self.rejected = 0
+        self.failed = 0
+        self.skipped = 0
+
+    def start(self) -> None:
+        """Re-queue tickets left pending by a restart. Runs on a worker, so startup does not wait for the DB."""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        self._pool.submit(self._recover)
+
+    def submit(self, pk: int) -> None:
+        with self._lock:
+            self.submitted += 1
+        self._pool.submit(self._run, pk)
+
+    def _recover(self) -> None:
+        # A ticket submitted meanwhile may be queued twice; classify() skips it once it is no longer pending
+        close_old_connections()
+        try:
+            pending = list(Issue.objects.filter(status=PENDING).values_list("pk", flat=True))
+        except Exception as e:
+            print(f"[intake] could not look for pending issues: {e}", file=sys.stderr)
+            return
+        finally:
+            close_old_connections()
+        for pk in pending:
+            self.submit(pk)
+
+    def _run(self, pk: int) -> None:
+        close_old_connections()
+        try:
+            if self.classify(pk) is None:
+                with self._lock:
+                    self.skipped += 1
+        except Exception as e:
+            with self._lock:
+                self.failed += 1
+            print(f"[intake] classification of issue pk={pk} failed: {e}", file=sys.stderr)
+        finally:
+            close_old_connections()
+
+    def classify(self, pk: int) -> Optional[str]:
+        """Apply the verdict to one pending issue. Returns its new status (None if it was no longer pending)."""
+        from .serializers import IssueSerializer  # serializers imports this module's constants
+
+        issue = Issue.objects.filter(pk=pk, status=PENDING).first()
+        if issue is None:
+            return None
+        error, category, subcategory, source = IssueSerializer.judge(issue.description)
+        changes: Dict[str, object] = {"updated_at": timezone.now()}
+        if error:
+            changes.update(status=REJECTED, classification_note=error)
+        else:
+            changes["status"] = "open"
+            # Replace only what intake filled in locally; a category the caller sent is kept.
+            # The marker stays when the verdict is the keyword fallback again.
+            if category and issue.classification_note == LOCAL_CATEGORY:
+                changes["category"] = category
+                if source != IssueSerializer.SOURCE_KEYWORDS:
+                    changes["classification_note"] = ""
+                if subcategory and not issue.subcategory:
+                    changes["subcategory"] = subcategory
+        # Guarded on the status so an edit made meanwhile (e.g. an agent closing it) is not overwritten
+        updated = Issue.objects.filter(pk=pk, status=PENDING).update(**changes)
+        if not updated:
+            return None
+        with self._lock:
+            if error:
+                self.rejected += 1
+            else:
+                self.accepted += 1
+        return changes["status"]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            done = self.accepted + self.rejected + self.failed + self.skipped
+            return {
+                "submitted": self.submitted,
+                "in_flight": self.submitted - done,
+                "accepted": self.accepted,
+                "rejected": self.rejected,
+                "failed": self.failed,
+                "skipped": self.skipped,
+            }
+
+
+_queue: Optional[ClassificationQueue] = None
+_queue_guard = threading.Lock()
+
+
+def get_queue() -> ClassificationQueue:
+    global _queue
+    if _queue is None:
+        with _queue_guard:
+            if _queue is None:
+                _queue = ClassificationQueue(settings.CLASSIFICATION_WORKERS)
+                _queue.start()
+    return _queue
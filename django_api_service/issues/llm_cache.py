@@ -0,0 +1,140 @@
+"""
+Persistent cache for Gemini responses.
+
+Rows are keyed by sha256(model + prompt) and live in their own SQLite file
+(GEMINI_CACHE_PATH), so duplicate descriptions skip the LLM even across
+restarts. Entries expire after GEMINI_CACHE_TTL seconds, and the least
+recently used ones are evicted beyond GEMINI_CACHE_MAX_ENTRIES. Each row
+keeps the latency of the call that produced it, so every hit adds that much
+to the "latency saved" total.
+"""
+import hashlib
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from django.conf import settings
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    response TEXT NOT NULL,
+    latency_ms REAL NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS responses_last_used ON responses(last_used);
+"""
+
+
+def cache_key(model: str, prompt: str) -> str:
+    return hashlib.sha256(f"{model}\0{prompt}".encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Model+prompt -> response text in SQLite, with TTL, LRU eviction and hit/miss accounting."""
+
+    def __init__(self, db_path: str, ttl: float, max_entries: int):
+        self.db_path = str(db_path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.saved_ms = 0.0
+        self._conn().executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, model: str, prompt: str) -> Optional[str]:
+        key = cache_key(model, prompt)
+        now = time.time()
+        conn = self._conn()
+        row = conn.execute("SELECT response, latency_ms, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None or (self.ttl and now - row[2] > self.ttl):
+            with self._lock:
+                self.misses += 1
+            return None
+        conn.execute("UPDATE responses SET last_used = ?, hits = hits + 1 WHERE key = ?", (now, key))
+        with self._lock:
+            self.hits += 1
+            self.saved_ms += row[1]
+        return row[0]
+
+    def put(self, model: str, prompt: str, response: str, latency_ms: float) -> None:
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            "INSERT INTO responses (key, model, response, latency_ms, created_at, last_used) VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET response = excluded.response, latency_ms = excluded.latency_ms, "
+            "created_at = excluded.created_at, last_used = excluded.last_used",
+            (cache_key(model, prompt), model, response, latency_ms, now, now),
+        )
+        self._evict(conn, now)
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        if self.ttl:
+            conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl,))
+        if self.max_entries > 0:
+            extra = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0] - self.max_entries
+            if extra > 0:
+                conn.execute(
+                    "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY last_used LIMIT ?)", (extra,)
+                )
+
+    def stats(self) -> Dict[str, float]:
+        entries, saved_total = self._conn().execute(
+            "SELECT COUNT(*), COALESCE(SUM(hits * latency_ms), 0) FROM responses"
+        ).fetchone()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": entries,
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "latency_saved_ms": round(self.saved_ms, 1),
+                "latency_saved_ms_all_time": round(saved_total, 1),
+            }
+
+    def generate(self, model: str, prompt: str, call: Callable[[], str], accept: Callable[[str], bool]) -> Tuple[str, bool]:
+        """
+        Cached response for (model, prompt), or call() and store its result
+        when accept(result) is true. Returns (text, cache_hit).
+        """
+        cached = self.get(model, prompt)
+        if cached is not None:
+            return cached, True
+        started = time.perf_counter()
+        text = call()
+        if accept(text):
+            self.put(model, prompt, text, (time.perf_counter() - started) * 1000)
+        return text, False
+
+
+_cache: Optional[ResponseCache] = None
+_cache_guard = threading.Lock()
+
+
+def get_cache() -> ResponseCache:
+    global _cache
+    if _cache is None:
+        with _cache_guard:
+            if _cache is None:
+                _cache = ResponseCache(
+                    settings.GEMINI_CACHE_PATH, settings.GEMINI_CACHE_TTL, settings.GEMINI_CACHE_MAX_ENTRIES
+                )
+    return _cache
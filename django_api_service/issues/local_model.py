@@ -0,0 +1,187 @@
+"""
+Offline issue classifier trained from ticket history.
+
+A linear (softmax) model over hashed features: word unigrams and bigrams
+plus character trigrams, which cope with Turkish suffixes. It is pure
+Python, so it needs no extra dependency. `manage.py train_issue_model` builds it from
+problems.txt (plus its archive) and the Issue table and writes a JSON file
+(ISSUE_MODEL_PATH). Labels are Django categories, plus "not_it" for tickets
+the async intake rejected.
+
+predict() returns the best label and its posterior probability. The
+serializer trusts it when the probability reaches ISSUE_MODEL_MIN_CONFIDENCE
+and escalates everything else to Gemini.
+"""
+import json
+import math
+import os
+import random
+import re
+import threading
+import zlib
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+
+NOT_IT = "not_it"
+# problems.txt uses the MCP/expert vocabulary; map it onto the Django categories
+MCP_TO_DJANGO = {
+    ("software", "login"): "access",
+    ("software", "password"): "access",
+    "software": "software",
+    "network": "network",
+    "hardware": "hardware",
+}
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def mcp_label(category: str, subcategory: str) -> Optional[str]:
+    category, subcategory = (category or "").strip().lower(), (subcategory or "").strip().lower()
+    return MCP_TO_DJANGO.get((category, subcategory)) or MCP_TO_DJANGO.get(category)
+
+
+def features(text: str, n_features: int) -> Counter:
+    """Hashed feature counts. crc32 rather than hash() so indexes are stable across processes."""
+    words = _WORD_RE.findall((text or "").casefold())
+    grams = list(words)
+    grams += [f"{a} {b}" for a, b in zip(words, words[1:])]
+    for w in words:
+        padded = f"<{w}>"
+        grams += [padded[i:i + 3] for i in range(len(padded) - 2)]
+    return Counter(zlib.crc32(g.encode("utf-8")) % n_features for g in grams)
+
+
+class HashedLinearModel:
+    """
+    Multinomial logistic regression (softmax) over L2-normalised hashed
+    feature counts, trained with SGD. Features never seen in training carry
+    no weight, so text in unfamiliar words gets a low confidence and is
+    escalated rather than forced into the nearest category.
+    """
+
+    def __init__(self, n_features: int = 1 << 18, epochs: int = 15, learning_rate: float = 0.5, l2: float = 1e-4):
+        self.n_features = n_features
+        self.epochs = epochs
+        self.learning_rate = learning_rate
+        self.l2 = l2
+        self.labels: List[str] = []
+        self.bias: List[float] = []
+        self.weights: Dict[int, List[float]] = {}
+
+    def _vector(self, text: str) -> List[Tuple[int, float]]:
+        counts = features(text, self.n_features)
+        norm = math.sqrt(sum(v * v for v in counts.values())) or 1.0
+        return [(idx, v / norm) for idx, v in counts.items()]
+
+    def _probabilities(self, vector: List[Tuple[int, float]]) -> List[float]:
+        logits = list(self.bias)
+        weights = self.weights
+        for idx, v in vector:
+            w = weights.get(idx)
+            if w is not None:
+                for k, wk in enumerate(w):
+                    logits[k] += wk * v
+        top = max(logits)
+        exps = [math.exp(z - top) for z in logits]
+        total = sum(exps)
+        return [e / total for e in exps]
+
+    def fit(self, samples: Iterable[Tuple[str, str]]) -> "HashedLinearModel":
+        data = [(self._vector(text), label) for text, label in samples]
+        self.labels = sorted({label for _, label in data})
+        index = {label: k for k, label in enumerate(self.labels)}
+        n = len(self.labels)
+        self.bias = [0.0] * n
+        self.weights = {}
+        rng = random.Random(0)  # reproducible model for the same history
+        for epoch in range(self.epochs):
+            rng.shuffle(data)
+            lr = self.learning_rate / (1 + epoch)
+            for vector, label in data:
+                grad = self._probabilities(vector)
+                grad[index[label]] -= 1.0
+                for k in range(n):
+                    self.bias[k] -= lr * grad[k]
+                for idx, v in vector:
+                    w = self.weights.setdefault(idx, [0.0] * n)
+                    for k in range(n):
+                        w[k] -= lr * (grad[k] * v + self.l2 * w[k])
+        return self
+
+    def predict(self, text: str) -> Optional[Tuple[str, float]]:
+        """(label, probability), or None for an untrained model."""
+        if not self.labels:
+            return None
+        probs = self._probabilities(self._vector(text))
+        best = max(range(len(probs)), key=probs.__getitem__)
+        return self.labels[best], probs[best]
+
+    def to_dict(self) -> Dict:
+        return {
+            "kind": "hashed_softmax",
+            "n_features": self.n_features,
+            "labels": self.labels,
+            "bias": self.bias,
+            "weights": {str(idx): [round(x, 6) for x in w] for idx, w in self.weights.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "HashedLinearModel":
+        model = cls(data["n_features"])
+        model.labels = list(data["labels"])
+        model.bias = list(data["bias"])
+        model.weights = {int(idx): w for idx, w in data["weights"].items()}
+        return model
+
+    def save(self, path: str) -> None:
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, separators=(",", ":"))
+        os.replace(tmp, path)
+
+
+_model: Optional[HashedLinearModel] = None
+_model_stamp: Optional[Tuple[int, int]] = None
+_lock = threading.Lock()
+_counts = {"fast_path": 0, "escalated": 0}
+
+
+def get_model() -> Optional[HashedLinearModel]:
+    """The trained model from ISSUE_MODEL_PATH, reloaded when the file changes; None if not trained yet."""
+    global _model, _model_stamp
+    path = str(settings.ISSUE_MODEL_PATH)
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    stamp = (st.st_mtime_ns, st.st_size)
+    with _lock:
+        if stamp != _model_stamp:
+            with open(path, "r", encoding="utf-8") as f:
+                _model = HashedLinearModel.from_dict(json.load(f))
+            _model_stamp = stamp
+        return _model
+
+
+def predict(text: str) -> Optional[Tuple[str, float]]:
+    model = get_model()
+    return model.predict(text) if model is not None else None
+
+
+def record(fast_path: bool) -> None:
+    with _lock:
+        _counts["fast_path" if fast_path else "escalated"] += 1
+
+
+def stats() -> Dict[str, object]:
+    model = get_model()
+    with _lock:
+        counts = dict(_counts)
+    counts.update(
+        trained=model is not None,
+        labels=model.labels if model is not None else [],
+        min_confidence=settings.ISSUE_MODEL_MIN_CONFIDENCE,
+    )
+    return counts
@@ -0,0 +1,91 @@
+import os
+import zlib
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+import classification_rules
+import issue_store
+from issues import intake, local_model
+from issues.models import Issue
+from issues.serializers import IssueSerializer
+
+
+class Command(BaseCommand):
+    help = "Train the offline issue classifier from problems.txt (and its archive) and the Issue table."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", default=str(settings.ISSUE_MODEL_PATH))
+        parser.add_argument("--holdout", type=float, default=0.2,
+                            help="Fraction held out to report accuracy/coverage before the final fit on everything.")
+        parser.add_argument("--n-features", type=int, default=1 << 18)
+        parser.add_argument("--epochs", type=int, default=15)
+
+    def handle(self, *args, **options):
+        samples = self.collect()
+        if not samples:
+            self.stderr.write("No labelled issues found; nothing to train on.")
+            return
+        counts = Counter(label for _, label in samples)
+        self.stdout.write(f"{len(samples)} samples: " + ", ".join(f"{k}={v}" for k, v in sorted(counts.items())))
+
+        holdout = min(max(options["holdout"], 0.0), 0.9)
+        if holdout and len(samples) >= 20:
+            # Split on a hash of the text so reruns evaluate on the same tickets
+            cut = int(holdout * 100)
+            test = [s for s in samples if zlib.crc32(s[0].encode("utf-8")) % 100 < cut]
+            train = [s for s in samples if zlib.crc32(s[0].encode("utf-8")) % 100 >= cut]
+            if test and train:
+                self.evaluate(local_model.HashedLinearModel(options["n_features"], options["epochs"]).fit(train), test)
+
+        model = local_model.HashedLinearModel(options["n_features"], options["epochs"]).fit(samples)
+        model.save(options["output"])
+        self.stdout.write(self.style.SUCCESS(f"Saved model ({len(model.labels)} labels) to {options['output']}"))
+
+    def collect(self):
+        """(description, label) pairs, one per distinct description; the Issue table wins over the file."""
+        by_text = {}
+        path = settings.PROBLEMS_FILE
+        # problems.txt categories mostly come from main.ai_classify_issue; its answer when no keyword
+        # rule matched (software/general unless the rules file says otherwise) says nothing about the ticket
+        fallbacks = {("software", "general"), classification_rules.get_rules().mcp_default}
+        if os.path.exists(path):
+            for rec in list(issue_store.iter_archived(path)) + list(issue_store.iter_issues(path)):
+                if (rec.category.strip().lower(), rec.subcategory.strip().lower()) in fallbacks:
+                    continue
+                label = local_model.mcp_label(rec.category, rec.subcategory)
+                if rec.description.strip() and label:
+                    by_text[rec.description.strip().casefold()] = (rec.description.strip(), label)
+        # Keyword verdicts (a category still marked as intake's guess, or a rejection only the keyword
+        # IT check made) were never confirmed, so they are no label either
+        rows = (Issue.objects.exclude(status=intake.PENDING)
+                .exclude(classification_note__in=[intake.LOCAL_CATEGORY, IssueSerializer.KEYWORD_REJECTION])
+                .values_list("description", "category", "status"))
+        for description, category, status in rows.iterator():
+            if status == intake.REJECTED:
+                label = local_model.NOT_IT
+            elif category in IssueSerializer.ALLOWED_CATEGORIES:
+                label = category
+            else:
+                continue
+            if description.strip():
+                by_text[description.strip().casefold()] = (description.strip(), label)
+        return list(by_text.values())
+
+    def evaluate(self, model, test):
+        threshold = settings.ISSUE_MODEL_MIN_CONFIDENCE
+        correct = confident = confident_correct = 0
+        for text, label in test:
+            predicted, confidence = model.predict(text)
+            correct += predicted == label
+            if confidence >= threshold:
+                confident += 1
+                confident_correct += predicted == label
+        line = f"Holdout ({len(test)}): accuracy {correct / len(test):.1%}; "
+        if confident:
+            line += (f"confidence >= {threshold} on {confident / len(test):.1%} of issues "
+                     f"(skip Gemini), accuracy there {confident_correct / confident:.1%}")
+        else:
+            line += f"no prediction reaches confidence {threshold}"
+        self.stdout.write(line)
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-18 12:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('issues', '0002_expert'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='issue',
+            name='classification_note',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='issue',
+            name='status',
+            field=models.CharField(default='open', max_length=32),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:02
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('issues', '0003_issue_async_classification'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='expert',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
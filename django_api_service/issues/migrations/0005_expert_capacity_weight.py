@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('issues', '0004_expert_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='expert',
+            name='capacity',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='expert',
+            name='weight',
+            field=models.PositiveSmallIntegerField(default=1),
+        ),
+    ]
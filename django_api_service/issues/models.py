@@ -8,9 +8,10 @@ class Issue(models.Model):
     category = models.CharField(max_length=32)
     subcategory = models.CharField(max_length=32)
     priority = models.CharField(max_length=16, default="low")
-    status = models.CharField(max_length=16, default="open")
+    status = models.CharField(max_length=32, default="open")
     assigned_expert_id = models.CharField(max_length=64, blank=True, default="")
     ai_solution = models.TextField(blank=True, default="")
+    classification_note = models.CharField(max_length=255, blank=True, default="")  # why classification rejected it, or intake.LOCAL_CATEGORY for a keyword-guessed category
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -25,6 +26,9 @@ class Expert(models.Model):
     contact = models.CharField(max_length=128, blank=True, default="")
     availability = models.BooleanField(default=True)
     current_load = models.IntegerField(default=0)
+    capacity = models.PositiveIntegerField(null=True, blank=True)  # max open assignments; empty = no cap
+    weight = models.PositiveSmallIntegerField(default=1)  # share of new work relative to equally skilled experts
+    updated_at = models.DateTimeField(auto_now=True)  # change stamp for the MCP server's expert directory
 
     def __str__(self) -> str:
         return f"{self.id} - {self.name}"
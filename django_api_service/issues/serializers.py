@@ -1,15 +1,17 @@
 from rest_framework import serializers
 from .models import Issue, Expert
-import google.generativeai as genai
-import os
 from django.conf import settings
 
+import classification_rules  # repo root is on sys.path (see api/settings.py)
+from . import gemini, intake, local_model
+from .gemini import GeminiUnavailable
+
 
 class IssueSerializer(serializers.ModelSerializer): # serializer for the Issue model #
     class Meta:
         model = Issue
         fields = "__all__"
-        read_only_fields = ("issue_id", "created_at", "updated_at")
+        read_only_fields = ("issue_id", "classification_note", "created_at", "updated_at")
         extra_kwargs = {
             "category": {"required": False, "allow_blank": True},
             "subcategory": {"required": False, "allow_blank": True},
@@ -36,136 +38,92 @@ class IssueSerializer(serializers.ModelSerializer): # serializer for the Issue m
     ALLOWED_PRIORITIES = {"low", "medium", "high", "urgent"}
     ALLOWED_STATUSES = {"open", "in_progress", "resolved", "closed"}
 
-    # Centralized model name for Gemini
-    GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
+    # Where judge()'s verdict came from; KEYWORDS means the classification_rules.json fallback
+    SOURCE_MODEL = "local_model"
+    SOURCE_GEMINI = "gemini"
+    SOURCE_KEYWORDS = "keywords"
+    # judge()'s rejection when only the keyword IT check decided it
+    KEYWORD_REJECTION = "Please describe a computer/device/network issue."
 
+    # Local heuristics share the repo-wide rules file (classification_rules.json, "django" section)
     @staticmethod
     def _local_it_check(description: str) -> bool:
-        d = description.lower()
-        pos = [
-            "computer", "pc", "laptop", "mac", "windows", "linux", "software", "program",
-            "login", "password", "account", "vpn", "email", "outlook",
-            "network", "internet", "wifi", "ethernet", "router", "dns",
-            "printer", "keyboard", "mouse", "monitor", "screen", "battery", "charger",
-            "iphone", "android", "tablet", "mobile",
-            "bilgisayar", "ekran", "klavye", "fare", "yazıcı", "ağ", "şifre",
-        ]
-        neg = [
-            "musluk", "lavabo", "plumbing", "sink", "araba", "car", "bike", "bicycle", "sofa", "garden",
-        ]
-        if any(n in d for n in neg):
-            return False
-        return any(p in d for p in pos)
+        return classification_rules.get_rules().is_it_issue("", classification_rules.cached_hits(description))
 
     @staticmethod
     def _local_infer_category(description: str) -> str:
-        d = description.lower()
-        if any(k in d for k in ["vpn", "network", "wifi", "ethernet", "router", "dns"]):
-            return "network"
-        if any(k in d for k in ["login", "password", "şifre", "account", "access"]):
-            return "access"
-        if any(k in d for k in ["outlook", "software", "program", "install", "update", "app"]):
-            return "software"
-        if any(k in d for k in ["printer", "print"]):
-            return "printing"
-        if any(k in d for k in ["webcam", "camera", "microphone", "speaker", "headset", "dock", "hub"]):
-            return "peripheral"
-        if any(k in d for k in ["iphone", "android", "tablet", "mobile", "ipad"]):
-            return "mobile"
-        if any(k in d for k in ["antivirus", "certificate", "bitlocker", "encryption"]):
-            return "security"
-        if any(k in d for k in ["ssd", "hdd", "disk", "storage"]):
-            return "storage"
-        return "hardware"
+        return classification_rules.get_rules().infer_category("", classification_rules.cached_hits(description))
 
     @staticmethod
-    def classify_with_gemini(description):
-        """Use Gemini AI to classify if the description is an IT-related issue.
-        Returns a tuple: (status, detail)
+    def analyze_with_gemini(description, cache_report=None):
+        """Validity, category and subcategory from ONE structured Gemini call.
+        Returns (status, detail, category, subcategory).
         status in {"VALID_IT_ISSUE", "NOT_IT_ISSUE", "INSUFFICIENT_DETAIL", "AI_UNAVAILABLE"}
-        detail is a short string for logging/explanation.
+        detail is a short string for logging/explanation ("cache_hit" when served from the response cache).
+        category is "" when the model's answer is not one of ALLOWED_CATEGORIES.
         """
         try:
-            # Configure Gemini API (accept either env var name)
-            api_key = os.getenv('GEMINI_API_KEY') or os.getenv('GOOGLE_API_KEY')
-            if not api_key:
-                return "AI_UNAVAILABLE", "Missing API key"
-            
-            genai.configure(api_key=api_key)
-            model = genai.GenerativeModel(IssueSerializer.GEMINI_MODEL)
-            
-            # Create classification prompt
-            prompt = f"""
-            Analyze this user message and determine if it describes an IT/computer/device-related technical issue that should be logged in an IT support system.
-
-            Message: "{description}"
-
-            Consider it a valid IT issue if it involves:
-            - Computer hardware problems (laptop, desktop, keyboard, mouse, monitor, etc.)
-            - Software issues (applications, operating systems, updates, installations)
-            - Network connectivity problems (WiFi, VPN, internet, email)
-            - Access/authentication issues (login, passwords, accounts)
-            - Peripheral devices (printers, scanners, webcams, etc.)
-            - Mobile devices (phones, tablets)
-            - Security concerns (antivirus, encryption, certificates)
-
-            Do NOT consider it an IT issue if it involves:
-            - Household problems (plumbing, appliances, furniture)
-            - Vehicle issues (cars, bikes, motorcycles)
-            - General greetings or small talk
-            - Non-technical, personal problems
-            - Facility maintenance (doors, windows, painting)
-
-            Respond with ONLY one of these exact responses:
-            - "VALID_IT_ISSUE"
-            - "NOT_IT_ISSUE"
-            - "INSUFFICIENT_DETAIL"
-
-            Response:"""
-            
-            response = model.generate_content(prompt)
-            result = (response.text or "").strip().upper()
-            if result in {"VALID_IT_ISSUE", "NOT_IT_ISSUE", "INSUFFICIENT_DETAIL"}:
-                return result, "ok"
-            return "AI_UNAVAILABLE", f"Unexpected model response: {result!r}"
-            
+            report = {} if cache_report is None else cache_report
+            result = gemini.analyze(description, IssueSerializer.ALLOWED_CATEGORIES, report)
+            detail = "cache_hit" if report.get("analyze") == "hit" else "ok"
+            return result["verdict"], detail, result["category"], result["subcategory"]
+        except GeminiUnavailable as e:
+            return "AI_UNAVAILABLE", str(e), "", ""
         except Exception as e:
             msg = str(e)
             if "429" in msg or "quota" in msg.lower():
-                return "AI_UNAVAILABLE", "rate_limited"
-            return "AI_UNAVAILABLE", msg
+                return "AI_UNAVAILABLE", "rate_limited", "", ""
+            return "AI_UNAVAILABLE", msg, "", ""
 
-    @staticmethod
-    def categorize_with_gemini(description):
-        """Use Gemini AI to categorize the IT issue"""
-        try:
-            api_key = os.getenv('GEMINI_API_KEY') or os.getenv('GOOGLE_API_KEY')
-            if not api_key:
-                return IssueSerializer._local_infer_category(description)
-            
-            genai.configure(api_key=api_key)
-            model = genai.GenerativeModel(IssueSerializer.GEMINI_MODEL)
-            
-            prompt = f"""
-            Categorize this IT issue description into one of these categories:
-
-            Categories: hardware, software, network, access, printing, peripheral, mobile, security, storage
-
-            Issue description: "{description}"
-
-            Respond with ONLY the category name (lowercase, one word).
-
-            Response:"""
-            
-            response = model.generate_content(prompt)
-            category = (response.text or "").strip().lower()
-            if category in IssueSerializer.ALLOWED_CATEGORIES:
-                return category
-            else:
-                return IssueSerializer._local_infer_category(description)
-                
-        except Exception:
-            return IssueSerializer._local_infer_category(description)
+    @classmethod
+    def _local_model_verdict(cls, description):
+        """(error, category, subcategory, source) from the offline model, or None to escalate to Gemini.
+        Used only when the model is confident AND the keyword rules agree on IT vs not IT.
+        """
+        prediction = local_model.predict(description)
+        if prediction is None:
+            return None  # not trained yet
+        label, confidence = prediction
+        verdict = None
+        if confidence >= settings.ISSUE_MODEL_MIN_CONFIDENCE:
+            if label == local_model.NOT_IT:
+                if not cls._local_it_check(description):
+                    verdict = ("This doesn't appear to be an IT/computer/device-related issue.", "", "", cls.SOURCE_MODEL)
+            elif label in cls.ALLOWED_CATEGORIES and cls._local_it_check(description):
+                verdict = (None, label, "", cls.SOURCE_MODEL)
+        local_model.record(verdict is not None)
+        return verdict
+
+    @classmethod
+    def judge(cls, description, cache_report=None):
+        """Offline model verdict when it is confident, otherwise Gemini (one structured call)
+        with the local heuristic as fallback.
+        Returns (error, category, subcategory, source): error is None when the description is an
+        acceptable IT issue, otherwise the message to show the user; source is SOURCE_MODEL,
+        SOURCE_GEMINI or SOURCE_KEYWORDS (the keyword rules decided, so nothing to learn from).
+        """
+        verdict = cls._local_model_verdict(description)
+        if verdict is not None:
+            if cache_report is not None:
+                cache_report["analyze"] = "local_model"
+            return verdict
+
+        status, detail, ai_category, ai_subcategory = cls.analyze_with_gemini(description, cache_report)
+
+        if status == "AI_UNAVAILABLE":
+            # Fallback to local heuristic
+            if not cls._local_it_check(description):
+                return cls.KEYWORD_REJECTION, "", "", cls.SOURCE_KEYWORDS
+            # Accept and infer locally
+            return None, cls._local_infer_category(description), "", cls.SOURCE_KEYWORDS
+        if status == "INSUFFICIENT_DETAIL":
+            return "Please provide a bit more detail so we can understand the IT issue.", "", "", cls.SOURCE_GEMINI
+        if status == "NOT_IT_ISSUE":
+            return "This doesn't appear to be an IT/computer/device-related issue.", "", "", cls.SOURCE_GEMINI
+        # VALID_IT_ISSUE → AI category/subcategory (local category if the model's was not allowed)
+        if ai_category:
+            return None, ai_category, ai_subcategory, cls.SOURCE_GEMINI
+        return None, cls._local_infer_category(description), "", cls.SOURCE_KEYWORDS
 
     def validate(self, attrs):
         description = attrs.get("description", "").strip()
@@ -176,30 +134,27 @@ class IssueSerializer(serializers.ModelSerializer): # serializer for the Issue m
                 "description": "Please provide more detail about the IT/device issue (at least 2 words).",
             })
 
-        # Try AI classification first
-        status, detail = self.classify_with_gemini(description)
-
-        if status == "AI_UNAVAILABLE":
-            # Fallback to local heuristic
-            if not self._local_it_check(description):
-                raise serializers.ValidationError({
-                    "description": "Please describe a computer/device/network issue.",
-                })
-            # Accept and infer locally
+        accept_now = settings.ASYNC_CLASSIFICATION and self.instance is None
+        if accept_now:
+            # Accept-then-classify: store with the local category; intake.py applies the Gemini verdict later
             if not (attrs.get("category") or "").strip():
                 attrs["category"] = self._local_infer_category(description)
-        elif status == "INSUFFICIENT_DETAIL":
-            raise serializers.ValidationError({
-                "description": "Please provide a bit more detail so we can understand the IT issue.",
-            })
-        elif status == "NOT_IT_ISSUE":
-            raise serializers.ValidationError({
-                "description": "This doesn't appear to be an IT/computer/device-related issue.",
-            })
+                attrs["classification_note"] = intake.LOCAL_CATEGORY
         else:
-            # VALID_IT_ISSUE → use AI category if not provided
+            # Whether the Gemini answer came from the response cache is kept for the view
+            self.gemini_cache = {}
+            error, ai_category, ai_subcategory, source = self.judge(description, self.gemini_cache)
+            if error:
+                raise serializers.ValidationError({"description": error})
             if not (attrs.get("category") or "").strip():
-                attrs["category"] = self.categorize_with_gemini(description)
+                attrs["category"] = ai_category
+                # Marked so train_issue_model does not learn the keyword rules back as labels
+                if source == self.SOURCE_KEYWORDS:
+                    attrs["classification_note"] = intake.LOCAL_CATEGORY
+                elif self.instance is not None and self.instance.classification_note == intake.LOCAL_CATEGORY:
+                    attrs["classification_note"] = ""
+                if not (attrs.get("subcategory") or "").strip() and ai_subcategory:
+                    attrs["subcategory"] = ai_subcategory
 
         # Optionally infer a simple subcategory if missing
         subcategory = (attrs.get("subcategory") or "").strip().lower()
@@ -225,6 +180,8 @@ class IssueSerializer(serializers.ModelSerializer): # serializer for the Issue m
                 "status": f"Invalid status. Allowed: {sorted(self.ALLOWED_STATUSES)}",
             })
 
+        if accept_now:
+            attrs["status"] = intake.PENDING
         return attrs
 
 
@@ -1,3 +1,175 @@
-from django.test import TestCase
+import os
+import tempfile
+import time
+from unittest import mock
 
-# Create your tests here.
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+
+from . import gemini, intake, llm_cache
+from .management.commands.train_issue_model import Command as TrainIssueModel
+from .models import Issue
+from .serializers import IssueSerializer
+
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out")
+        time.sleep(0.01)
+
+
+class ClassificationQueueTests(TransactionTestCase):
+    # TransactionTestCase: the workers read the rows from their own DB connections
+
+    def test_start_requeues_tickets_left_pending(self):
+        issue = Issue.objects.create(
+            issue_id="ISS901", description="VPN keeps dropping", category="network", subcategory="",
+            status=intake.PENDING, classification_note=intake.LOCAL_CATEGORY,
+        )
+        queue = intake.ClassificationQueue(1)
+        with mock.patch.object(IssueSerializer, "judge", return_value=(None, "network", "vpn", IssueSerializer.SOURCE_GEMINI)):
+            queue.start()
+            wait_for(lambda: queue.stats()["accepted"] == 1)
+        issue.refresh_from_db()
+        self.assertEqual(issue.status, "open")
+        self.assertEqual(queue.stats()["submitted"], 1)
+
+    def test_keyword_verdict_keeps_local_marker(self):
+        guessed = Issue.objects.create(
+            issue_id="ISS903", description="VPN keeps dropping", category="network", subcategory="",
+            status=intake.PENDING, classification_note=intake.LOCAL_CATEGORY,
+        )
+        queue = intake.ClassificationQueue(1)
+        verdict = (None, "network", "", IssueSerializer.SOURCE_KEYWORDS)
+        with mock.patch.object(IssueSerializer, "judge", return_value=verdict):
+            queue.submit(guessed.pk)
+            wait_for(lambda: queue.stats()["accepted"] == 1)
+        guessed.refresh_from_db()
+        self.assertEqual(guessed.status, "open")
+        self.assertEqual(guessed.classification_note, intake.LOCAL_CATEGORY)
+
+
+@override_settings(ASYNC_CLASSIFICATION=False, PROBLEMS_FILE="/nonexistent/problems.txt")
+class KeywordFallbackTests(TestCase):
+
+    def create(self, issue_id, description):
+        serializer = IssueSerializer(data={"description": description, "employee_id": "E1"})
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        return serializer.save(issue_id=issue_id)
+
+    def test_gemini_unavailable_marks_keyword_category(self):
+        with mock.patch.object(IssueSerializer, "_local_model_verdict", return_value=None), \
+                mock.patch.object(IssueSerializer, "analyze_with_gemini", return_value=("AI_UNAVAILABLE", "", "", "")):
+            issue = self.create("ISS904", "My wifi network connection keeps dropping")
+        self.assertEqual(issue.classification_note, intake.LOCAL_CATEGORY)
+
+    def test_gemini_category_is_not_marked(self):
+        verdict = ("VALID_IT_ISSUE", "", "network", "wifi")
+        with mock.patch.object(IssueSerializer, "_local_model_verdict", return_value=None), \
+                mock.patch.object(IssueSerializer, "analyze_with_gemini", return_value=verdict):
+            issue = self.create("ISS905", "My wifi network connection keeps dropping")
+        self.assertEqual((issue.category, issue.classification_note), ("network", ""))
+
+    def test_collect_skips_keyword_verdicts(self):
+        Issue.objects.create(issue_id="ISS906", description="Laptop screen flickers", category="hardware",
+                             classification_note=intake.LOCAL_CATEGORY)
+        Issue.objects.create(issue_id="ISS907", description="Lunch order is late", status=intake.REJECTED,
+                             classification_note=IssueSerializer.KEYWORD_REJECTION)
+        Issue.objects.create(issue_id="ISS908", description="Printer jams on every page", category="printing")
+        self.assertEqual(TrainIssueModel().collect(), [("Printer jams on every page", "printing")])
+
+
+class ResponseCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "gemini_cache.sqlite3")
+
+    def test_accepted_responses_are_served_again_after_restart(self):
+        calls = []
+        call = lambda: calls.append(1) or '{"verdict": "VALID_IT_ISSUE"}'
+        cache = llm_cache.ResponseCache(self.path, ttl=0, max_entries=0)
+        self.assertEqual(cache.generate("m", "p", call, bool), ('{"verdict": "VALID_IT_ISSUE"}', False))
+        self.assertEqual(cache.generate("m", "p", call, bool), ('{"verdict": "VALID_IT_ISSUE"}', True))
+        self.assertEqual(cache.generate("other-model", "p", call, bool)[1], False)
+        reopened = llm_cache.ResponseCache(self.path, ttl=0, max_entries=0)
+        self.assertEqual(reopened.generate("m", "p", call, bool)[1], True)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual((cache.stats()["hits"], cache.stats()["misses"]), (1, 2))
+
+    def test_rejected_responses_are_not_cached(self):
+        cache = llm_cache.ResponseCache(self.path, ttl=0, max_entries=0)
+        cache.generate("m", "p", lambda: "garbage", lambda text: False)
+        self.assertIsNone(cache.get("m", "p"))
+
+    def test_expired_and_least_recently_used_entries_go(self):
+        cache = llm_cache.ResponseCache(self.path, ttl=60, max_entries=2)
+        cache.put("m", "a", "A", 1)
+        cache.put("m", "b", "B", 1)
+        cache.get("m", "a")
+        cache.put("m", "c", "C", 1)  # evicts b, the least recently used
+        self.assertEqual([cache.get("m", k) for k in "abc"], ["A", None, "C"])
+        with mock.patch.object(llm_cache.time, "time", return_value=time.time() + 61):
+            self.assertIsNone(cache.get("m", "a"))
+
+    def test_analyze_reuses_cached_answer(self):
+        model = mock.Mock()
+        model.generate_content.return_value.text = '{"verdict": "VALID_IT_ISSUE", "category": "network", "subcategory": "vpn"}'
+        cache = llm_cache.ResponseCache(self.path, ttl=0, max_entries=0)
+        report = {}
+        with mock.patch.object(llm_cache, "_cache", cache), mock.patch.object(gemini, "get_model", return_value=model):
+            first = gemini.analyze("VPN keeps dropping", {"network"})
+            second = gemini.analyze("VPN keeps dropping", {"network"}, report)
+        self.assertEqual(first, second)
+        self.assertEqual(second["category"], "network")
+        self.assertEqual(report, {"analyze": "hit"})
+        self.assertEqual(model.generate_content.call_count, 1)
+
+
+class GeminiGuardTests(SimpleTestCase):
+
+    def setUp(self):
+        self.breaker = gemini.CircuitBreaker(failure_threshold=2, cooldown=60)
+        patches = [mock.patch.object(gemini, "BREAKER", self.breaker),
+                   mock.patch.object(gemini, "RATE_LIMITER", gemini.TokenBucket(0, 1))]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def fail(self):
+        raise RuntimeError("503")
+
+    def test_breaker_opens_after_consecutive_failures_and_fails_fast(self):
+        for _ in range(2):
+            with self.assertRaises(RuntimeError):
+                gemini.guarded_call(self.fail)
+        self.assertEqual(self.breaker.state, gemini.CircuitBreaker.OPEN)
+        called = mock.Mock(return_value="ok")
+        with self.assertRaisesMessage(gemini.GeminiUnavailable, "circuit_open"):
+            gemini.guarded_call(called)
+        called.assert_not_called()
+
+    def test_half_open_lets_one_probe_through(self):
+        for _ in range(2):
+            with self.assertRaises(RuntimeError):
+                gemini.guarded_call(self.fail)
+        self.breaker.opened_at -= 60  # cooldown elapsed
+        self.assertTrue(self.breaker.allow())
+        self.assertFalse(self.breaker.allow())  # the probe is still in flight
+        self.breaker.record(False)
+        self.assertEqual((self.breaker.state, self.breaker.times_opened), (gemini.CircuitBreaker.OPEN, 2))
+
+        self.breaker.opened_at -= 60
+        self.assertEqual(gemini.guarded_call(lambda: "ok"), "ok")
+        self.assertEqual((self.breaker.state, self.breaker.failures), (gemini.CircuitBreaker.CLOSED, 0))
+
+    def test_rate_limiter_sheds_without_tripping_the_breaker(self):
+        bucket = gemini.TokenBucket(rate=0.001, burst=2)
+        with mock.patch.object(gemini, "RATE_LIMITER", bucket):
+            self.assertEqual([gemini.guarded_call(lambda: "ok") for _ in range(2)], ["ok", "ok"])
+            with self.assertRaisesMessage(gemini.GeminiUnavailable, "rate_limited"):
+                gemini.guarded_call(lambda: "ok")
+        self.assertEqual(self.breaker.state, gemini.CircuitBreaker.CLOSED)
+        self.assertFalse(self.breaker._probing)
@@ -2,13 +2,19 @@ import os, sys, subprocess, json, re
 from rest_framework.decorators import api_view, action
 from rest_framework.response import Response
 from rest_framework import viewsets, status
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+import classification_rules
+import issue_store
+from . import gemini, intake, llm_cache, local_model
 from .models import Issue
 from .serializers import IssueSerializer
 
 MCP_DIR = os.environ.get("MCP_DIR", "/Users/minasenel/Desktop/untitled folder 2/mcp-it-helpdesk")
 MCP_PY = os.environ.get("MCP_PY", "/Users/minasenel/Desktop/untitled folder 2/mcp-it-helpdesk/.venv/bin/python")
 
-def run_mcp_python(code: str, timeout: int = 20, max_output: int = 10000) -> tuple[int, str, str]:
+def run_mcp_python(code: str, timeout: int = 20, max_output: int = 10000, stdin: str | None = None) -> tuple[int, str, str]:
     env = os.environ.copy()
     env["PYTHONPATH"] = MCP_DIR + os.pathsep + env.get("PYTHONPATH", "")
     wrapped = f"import sys; sys.path.insert(0, {MCP_DIR!r}); " + code
@@ -16,32 +22,60 @@ def run_mcp_python(code: str, timeout: int = 20, max_output: int = 10000) -> tup
         [MCP_PY, "-c", wrapped],
         cwd=MCP_DIR,
         env=env,
+        input=stdin,
         capture_output=True,
         text=True,
         timeout=timeout,
     )
     out = (proc.stdout or "").strip()
     err = (proc.stderr or "").strip()
-    if len(out) > max_output:
+    if max_output and len(out) > max_output:
         out = out[:max_output]
-    if len(err) > max_output:
+    if max_output and len(err) > max_output:
         err = err[:max_output]
     return proc.returncode, out, err
 
 
 @api_view(["GET"])
 def health(request):
-    return Response({"status": "ok"})
+    return Response({
+        "status": "ok",
+        "classification_cache": classification_rules.cache_stats(),
+        "gemini_cache": llm_cache.get_cache().stats(),
+        "gemini_guard": gemini.guard_stats(),
+        "local_model": local_model.stats(),
+        "classification_queue": intake.get_queue().stats() if settings.ASYNC_CLASSIFICATION else None,
+    })
 
 
 class IssueViewSet(viewsets.ModelViewSet):
     queryset = Issue.objects.all().order_by("-created_at")
     serializer_class = IssueSerializer
 
+    @staticmethod
+    def _highest_issue_number() -> int:
+        # Only consulted once, when the shared counter file does not exist yet
+        in_db = issue_store.max_issue_number(Issue.objects.values("issue_id"))
+        in_file = issue_store.max_issue_number(issue_store.load_issues(settings.PROBLEMS_FILE))
+        in_archive = issue_store.max_issue_number(issue_store.iter_archived(settings.PROBLEMS_FILE))
+        return max(in_db, in_file, in_archive)
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        self.perform_create(serializer)
+        headers = self.get_success_headers(serializer.data)
+        # e.g. "analyze=hit": whether the Gemini answer came from the persistent response cache
+        gemini_cache = getattr(serializer, "gemini_cache", None)
+        if gemini_cache:
+            headers["X-Gemini-Cache"] = ", ".join(f"{call}={result}" for call, result in gemini_cache.items())
+        return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
+
     def perform_create(self, serializer):
-        instance = serializer.save()
-        instance.issue_id = f"ISS{instance.pk:03d}"
-        instance.save()
+        issue_id = issue_store.allocate_issue_id(settings.PROBLEMS_FILE, seed=self._highest_issue_number)
+        issue = serializer.save(issue_id=issue_id)
+        if issue.status == intake.PENDING:
+            transaction.on_commit(lambda: intake.get_queue().submit(issue.pk))
 
     @action(detail=True, methods=["post"])
     def ai_solve(self, request, pk=None):
@@ -58,6 +92,46 @@ class IssueViewSet(viewsets.ModelViewSet):
         issue.save()
         return Response({"issue_id": issue.issue_id, "ai_solution": issue.ai_solution})
 
+    @action(detail=False, methods=["post"])
+    def ai_solve_bulk(self, request):
+        # One MCP subprocess for the whole batch (main.solve_many) instead of one per issue.
+        # Body: {"ids": [...]}; without ids, every open issue that has no AI solution yet.
+        ids = request.data.get("ids") or []
+        issues = list(Issue.objects.filter(pk__in=ids) if ids else Issue.objects.filter(status="open", ai_solution=""))
+        if not issues:
+            return Response({"count": 0, "results": []})
+        payload = json.dumps(
+            [{"description": i.description, "category": i.category, "subcategory": i.subcategory, "priority": i.priority} for i in issues]
+        )
+        code = "import sys, json; from main import solve_many; print(json.dumps(solve_many(json.load(sys.stdin))))"
+        rc, out, err = run_mcp_python(code, timeout=120, max_output=0, stdin=payload)
+        if rc != 0:
+            return Response({"error": "solve_many failed"}, status=500)
+
+        now = timezone.now()
+        for issue, (resolved, solution) in zip(issues, json.loads(out)):
+            # Same text ai_try_solve returns for a single issue
+            issue.ai_solution = solution if resolved else "Çözüm önerisi bulunamadı: uzman ataması önerilir."
+            issue.updated_at = now
+        Issue.objects.bulk_update(issues, ["ai_solution", "updated_at"])
+        return Response({
+            "count": len(issues),
+            "results": [{"issue_id": i.issue_id, "ai_solution": i.ai_solution} for i in issues],
+        })
+
+    @action(detail=False, methods=["post"])
+    def classify_bulk(self, request):
+        # Body: {"descriptions": [...]} -> MCP (category, subcategory) per description via main.classify_many
+        descriptions = [str(d) for d in request.data.get("descriptions") or []]
+        if not descriptions:
+            return Response({"count": 0, "results": []})
+        code = "import sys, json; from main import classify_many; print(json.dumps(classify_many(json.load(sys.stdin))))"
+        rc, out, err = run_mcp_python(code, timeout=120, max_output=0, stdin=json.dumps(descriptions))
+        if rc != 0:
+            return Response({"error": "classify_many failed"}, status=500)
+        results = [{"category": c, "subcategory": s} for c, s in json.loads(out)]
+        return Response({"count": len(results), "results": results})
+
     @action(detail=True, methods=["post"])
     def assign_expert(self, request, pk=None):
         issue = self.get_object()
@@ -0,0 +1,197 @@
+"""
+Least-loaded expert routing by expertise tag.
+
+ExpertRouter indexes available experts under each (lower-cased) expertise
+tag in a min-heap ordered by current_load / weight, plus one heap over all
+available experts for issues no one specialises in. pick() compares the tops of the
+category and subcategory heaps, so routing is O(log n) instead of filtering,
+lower-casing and sorting every expert on each assignment.
+
+Load and availability changes go through update()/add_load(): the expert's
+new entry is pushed and older entries are skipped (and dropped) when they
+surface at the top. Ties on load go to the expert listed first, exactly as the
+old stable sort did.
+
+Callers that assign in a loop add_load() after each pick, so equally skilled
+experts take turns: with the default weight of 1 this is plain round-robin,
+and an expert with weight 2 gets two issues for every one of a weight-1
+colleague. An expert whose current_load has reached their optional
+`capacity` is left out until the load drops again.
+
+ExpertDirectory keeps a router in step with the expert source (Django DB or
+tech_experts.json). At most every `check_seconds` it asks a cheap stamp
+function whether anything changed and reloads only when the stamp differs.
+"""
+import heapq
+import threading
+import time
+from typing import Callable, Dict, FrozenSet, Hashable, Iterable, List, Optional, Tuple
+
+# (current_load / weight, position in the directory, version, expert id)
+_Entry = Tuple[float, int, int, str]
+
+
+def at_capacity(expert: Dict) -> bool:
+    capacity = expert.get("capacity")
+    return capacity is not None and capacity != "" and int(expert.get("current_load", 0) or 0) >= int(capacity)
+
+
+class ExpertRouter:
+    def __init__(self, experts: Iterable[Dict] = ()):
+        self._experts: Dict[str, Dict] = {}
+        self._tags: Dict[str, FrozenSet[str]] = {}
+        self._position: Dict[str, int] = {}
+        self._version: Dict[str, int] = {}
+        self._heaps: Dict[str, List[_Entry]] = {}
+        self._any: List[_Entry] = []
+        # pick() pops stale heap tops, so readers mutate too; every public method holds this
+        self._lock = threading.RLock()
+        for expert in experts:
+            self.add(expert)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._experts)
+
+    def experts(self) -> List[Dict]:
+        """Directory order."""
+        with self._lock:
+            return sorted(self._experts.values(), key=lambda e: self._position[str(e.get("id", ""))])
+
+    def get(self, expert_id: str) -> Optional[Dict]:
+        with self._lock:
+            return self._experts.get(str(expert_id))
+
+    def add(self, expert: Dict) -> None:
+        """Add an expert (or replace one with the same id, keeping its place in the order)."""
+        expert_id = str(expert.get("id", ""))
+        with self._lock:
+            self._position.setdefault(expert_id, len(self._position))
+            self._experts[expert_id] = expert
+            self._tags[expert_id] = frozenset(str(x).lower() for x in (expert.get("expertise") or []))
+            self._push(expert_id)
+
+    def sync(self, experts: Iterable[Dict]) -> None:
+        """Make the index match a freshly loaded directory (its order decides ties)."""
+        experts = list(experts)
+        with self._lock:
+            self._position = {}
+            for expert in experts:
+                self.add(expert)
+            for expert_id in set(self._experts) - set(self._position):
+                self.remove(expert_id)
+
+    def remove(self, expert_id: str) -> None:
+        expert_id = str(expert_id)
+        with self._lock:
+            if self._experts.pop(expert_id, None) is not None:
+                self._tags.pop(expert_id, None)
+                self._position.pop(expert_id, None)
+                self._version[expert_id] = self._version.get(expert_id, 0) + 1  # invalidates its entries
+
+    def update(self, expert_id: str, *, current_load: Optional[int] = None, availability: Optional[bool] = None) -> None:
+        with self._lock:
+            expert = self._experts.get(str(expert_id))
+            if expert is None:
+                return
+            if current_load is not None:
+                expert["current_load"] = int(current_load)
+            if availability is not None:
+                expert["availability"] = bool(availability)
+            self._push(str(expert_id))
+
+    def add_load(self, expert_id: str, n: int = 1) -> None:
+        """Bump the expert's current_load by `n` (negative releases), never below 0."""
+        with self._lock:
+            expert = self._experts.get(str(expert_id))
+            if expert is not None:
+                self.update(expert_id, current_load=max(0, int(expert.get("current_load", 0) or 0) + n))
+
+    def pick(self, category: str, subcategory: str) -> Optional[Dict]:
+        """
+        Least-loaded (per unit of weight) available expert below capacity with
+        `category` or `subcategory` in their expertise; any such expert if
+        none has either.
+        """
+        category = (category or "").lower()
+        subcategory = (subcategory or "").lower()
+        with self._lock:
+            best = self._top(self._heaps.get(category))
+            other = self._top(self._heaps.get(subcategory)) if subcategory != category else None
+            if other is not None and (best is None or other < best):
+                best = other
+            if best is None:
+                best = self._top(self._any)
+            return self._experts[best[3]] if best is not None else None
+
+    def _push(self, expert_id: str) -> None:
+        version = self._version.get(expert_id, 0) + 1
+        self._version[expert_id] = version
+        expert = self._experts[expert_id]
+        load = int(expert.get("current_load", 0) or 0)
+        if not expert.get("availability") or at_capacity(expert):
+            return
+        weight = max(1, int(expert.get("weight") or 1))
+        entry = (load / weight, self._position[expert_id], version, expert_id)
+        for tag in self._tags[expert_id]:
+            heapq.heappush(self._heaps.setdefault(tag, []), entry)
+        heapq.heappush(self._any, entry)
+        if len(self._any) > 2 * len(self._experts) + 64:
+            self._rebuild()
+
+    def _valid(self, entry: _Entry) -> bool:
+        return self._version.get(entry[3]) == entry[2] and entry[3] in self._experts
+
+    def _top(self, heap: Optional[List[_Entry]]) -> Optional[_Entry]:
+        while heap:
+            if self._valid(heap[0]):
+                return heap[0]
+            heapq.heappop(heap)
+        return None
+
+    def _rebuild(self) -> None:
+        """Drop stale entries once they outnumber live ones."""
+        for tag, heap in list(self._heaps.items()):
+            heap[:] = [e for e in heap if self._valid(e)]
+            if heap:
+                heapq.heapify(heap)
+            else:
+                del self._heaps[tag]
+        self._any = [e for e in self._any if self._valid(e)]
+        heapq.heapify(self._any)
+
+
+class ExpertDirectory:
+    """Cached experts behind a change probe: load() runs only when stamp() returns something new."""
+
+    def __init__(self, load: Callable[[], List[Dict]], stamp: Callable[[], Hashable], check_seconds: float = 2.0):
+        self._load = load
+        self._stamp_fn = stamp
+        self.check_seconds = check_seconds
+        self._router = ExpertRouter()
+        self._stamp: Optional[Hashable] = None
+        self._checked: Optional[float] = None
+        self._lock = threading.Lock()
+        self.reloads = 0
+
+    def router(self) -> ExpertRouter:
+        """The router, refreshed first if the source changed since the last check."""
+        if self._checked is None or time.monotonic() - self._checked >= self.check_seconds:
+            with self._lock:
+                if self._checked is None or time.monotonic() - self._checked >= self.check_seconds:
+                    stamp = self._stamp_fn()
+                    if self._checked is None or stamp != self._stamp:
+                        self._router.sync(self._load())
+                        self._stamp = stamp
+                        self.reloads += 1
+                    self._checked = time.monotonic()
+        return self._router
+
+    def experts(self) -> List[Dict]:
+        return self.router().experts()
+
+    def invalidate(self) -> None:
+        """Re-check the stamp on the next access instead of waiting out check_seconds."""
+        with self._lock:
+            if self._checked is not None:
+                self._checked = float("-inf")
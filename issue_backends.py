@@ -0,0 +1,347 @@
+"""
+Storage backends for MCP issues.
+
+main.py talks to one IssueBackend and does not care where issues live:
+
+- FlatFileBackend: the existing problems.txt store (issue_store.py).
+- SQLiteBackend: an embedded SQLite database in WAL mode with indexes on
+  status and assigned_expert_id and transactional batch updates. It only uses
+  the standard library, so it works without Django.
+
+Pick one with HELPDESK_STORAGE=file|sqlite (see make_backend).
+"""
+import contextlib
+import os
+import sqlite3
+import threading
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple
+
+import issue_store
+from issue_store import FIELDS, Issue, IssueRecord
+
+Transform = Callable[[IssueRecord], Optional[IssueRecord]]
+
+
+class IssueBackend:
+    """Operations main.py needs from an issue store."""
+
+    name = "base"
+
+    def get(self, issue_id: str) -> Optional[IssueRecord]:
+        raise NotImplementedError
+
+    def append(self, issue: Issue) -> None:
+        """Store a brand-new issue."""
+        raise NotImplementedError
+
+    def put(self, issue: Issue) -> None:
+        """Store a new version of an existing issue."""
+        self.bulk_update([issue])
+
+    def bulk_update(self, issues: Iterable[Issue]) -> int:
+        """Store new versions of several issues at once. Returns how many were written."""
+        raise NotImplementedError
+
+    def by_status(self, *statuses: str) -> List[IssueRecord]:
+        raise NotImplementedError
+
+    def pending(self, *statuses: str) -> Tuple[List[IssueRecord], int, Any]:
+        """
+        Issues in `statuses` that may need processing, found without a full
+        scan. Returns (issues, records scanned, token for commit_pending).
+        """
+        found = self.by_status(*statuses)
+        return found, len(found), None
+
+    def commit_pending(self, token: Any, changed: Iterable[Issue], open_ids: Iterable[str] = ()) -> int:
+        """
+        Store the issues a pending() run changed and remember that run;
+        `open_ids` are the ones still actionable. Returns how many were written.
+        """
+        return self.bulk_update(changed)
+
+    def locked(self):
+        """
+        Context manager that keeps other writers out, held across pending()
+        and commit_pending() so a change made in between is not overwritten.
+        """
+        return contextlib.nullcontext()
+
+    def all(self) -> List[IssueRecord]:
+        return list(self.iter_all())
+
+    def iter_all(self) -> Iterator[IssueRecord]:
+        raise NotImplementedError
+
+    def replace_all(self, issues: Iterable[Issue]) -> None:
+        raise NotImplementedError
+
+    def rewrite(self, transform: Transform, before_commit: Optional[Callable[[], None]] = None) -> int:
+        """
+        Stream every issue through `transform` and persist the result (None
+        deletes). `before_commit` runs right before the changes become visible.
+        """
+        raise NotImplementedError
+
+    def compact(self) -> int:
+        return 0
+
+    def patch(self, issue_id: str, **changes: str) -> Optional[IssueRecord]:
+        issue = self.get(issue_id)
+        if issue is None:
+            return None
+        for key, value in changes.items():
+            issue[key] = value
+        self.put(issue)
+        return issue
+
+    def max_issue_number(self) -> int:
+        return issue_store.max_issue_number(self.iter_all())
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self.iter_all())
+
+
+class FlatFileBackend(IssueBackend):
+    name = "file"
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def get(self, issue_id: str) -> Optional[IssueRecord]:
+        return issue_store.get_issue(self.path, issue_id)
+
+    def append(self, issue: Issue) -> None:
+        issue_store.append_issue(self.path, issue)
+
+    def bulk_update(self, issues: Iterable[Issue]) -> int:
+        return issue_store.journal_updates(self.path, issues)
+
+    def by_status(self, *statuses: str) -> List[IssueRecord]:
+        return issue_store.get_index(self.path).with_status(*statuses)
+
+    def pending(self, *statuses: str) -> Tuple[List[IssueRecord], int, Any]:
+        return issue_store.pending_issues(self.path, statuses)
+
+    def commit_pending(self, token: Any, changed: Iterable[Issue], open_ids: Iterable[str] = ()) -> int:
+        return issue_store.commit_pending(self.path, token, changed, open_ids)
+
+    def locked(self):
+        return issue_store.store_lock(self.path)
+
+    def all(self) -> List[IssueRecord]:
+        return issue_store.load_issues(self.path)
+
+    def iter_all(self) -> Iterator[IssueRecord]:
+        return issue_store.iter_issues(self.path)
+
+    def replace_all(self, issues: Iterable[Issue]) -> None:
+        issue_store.write_issues(self.path, issues)
+
+    def rewrite(self, transform: Transform, before_commit: Optional[Callable[[], None]] = None) -> int:
+        return issue_store.rewrite_issues(self.path, transform, before_commit)
+
+    def compact(self) -> int:
+        return issue_store.compact(self.path)
+
+    def __len__(self) -> int:
+        return len(issue_store.get_index(self.path))
+
+
+_COLUMNS = ", ".join(FIELDS)
+_PLACEHOLDERS = ", ".join("?" for _ in FIELDS)
+_UPSERT = (
+    f"INSERT INTO issues ({_COLUMNS}) VALUES ({_PLACEHOLDERS}) "
+    "ON CONFLICT(issue_id) DO UPDATE SET "
+    + ", ".join(f"{f} = excluded.{f}" for f in FIELDS if f != "issue_id")
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS issues (
+    issue_id TEXT NOT NULL UNIQUE,
+    employee_id TEXT NOT NULL DEFAULT '',
+    description TEXT NOT NULL DEFAULT '',
+    category TEXT NOT NULL DEFAULT '',
+    subcategory TEXT NOT NULL DEFAULT '',
+    priority TEXT NOT NULL DEFAULT '',
+    status TEXT NOT NULL DEFAULT 'open',
+    assigned_expert_id TEXT NOT NULL DEFAULT '',
+    ai_solution TEXT NOT NULL DEFAULT '',
+    created_at TEXT NOT NULL DEFAULT '',
+    updated_at TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS issues_status ON issues(status);
+CREATE INDEX IF NOT EXISTS issues_expert ON issues(assigned_expert_id);
+"""
+
+
+def _row(issue: Issue) -> tuple:
+    rec = IssueRecord.from_mapping(issue)
+    return tuple(getattr(rec, f) for f in FIELDS)
+
+
+def _record(row) -> IssueRecord:
+    return IssueRecord(*row)
+
+
+class SQLiteBackend(IssueBackend):
+    """
+    Issues in a single SQLite table. Connections are per thread (the web agent
+    calls in from several), WAL lets readers run alongside the single writer,
+    and every multi-row change is one transaction.
+    """
+
+    name = "sqlite"
+    BATCH = 500
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._conn().executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=FULL" if issue_store.FSYNC_WRITES else "PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _tx(self):
+        return _Transaction(self._conn())
+
+    def get(self, issue_id: str) -> Optional[IssueRecord]:
+        row = self._conn().execute(f"SELECT {_COLUMNS} FROM issues WHERE issue_id = ?", ((issue_id or "").strip(),)).fetchone()
+        return _record(row) if row else None
+
+    def append(self, issue: Issue) -> None:
+        with self._tx() as conn:
+            conn.execute(f"INSERT INTO issues ({_COLUMNS}) VALUES ({_PLACEHOLDERS})", _row(issue))
+
+    def bulk_update(self, issues: Iterable[Issue]) -> int:
+        rows = [_row(i) for i in issues]
+        with self._tx() as conn:
+            conn.executemany(_UPSERT, rows)
+        return len(rows)
+
+    def patch(self, issue_id: str, **changes: str) -> Optional[IssueRecord]:
+        # Read and write inside one IMMEDIATE transaction so concurrent patches cannot lose updates.
+        with self._tx() as conn:
+            row = conn.execute(f"SELECT {_COLUMNS} FROM issues WHERE issue_id = ?", ((issue_id or "").strip(),)).fetchone()
+            if row is None:
+                return None
+            issue = _record(row)
+            for key, value in changes.items():
+                issue[key] = value
+            conn.execute(_UPSERT, _row(issue))
+        return issue
+
+    def pending(self, *statuses: str) -> Tuple[List[IssueRecord], int, Any]:
+        found = self.by_status(*statuses)
+        return found, len(found), {i["issue_id"]: i.get("updated_at", "") for i in found}
+
+    def commit_pending(self, token: Any, changed: Iterable[Issue], open_ids: Iterable[str] = ()) -> int:
+        # Skip rows someone else updated since pending() read them (updated_at moved) instead of
+        # overwriting their change; the next run picks those up again.
+        seen = token or {}
+        written = 0
+        with self._tx() as conn:
+            for issue in changed:
+                row = conn.execute("SELECT updated_at FROM issues WHERE issue_id = ?", (issue["issue_id"],)).fetchone()
+                if row is not None and issue["issue_id"] in seen and row[0] != seen[issue["issue_id"]]:
+                    continue
+                conn.execute(_UPSERT, _row(issue))
+                written += 1
+        return written
+
+    def by_status(self, *statuses: str) -> List[IssueRecord]:
+        keys = [(s or "open").lower() for s in statuses]
+        if not keys:
+            return []
+        marks = ", ".join("?" for _ in keys)
+        cur = self._conn().execute(f"SELECT {_COLUMNS} FROM issues WHERE status IN ({marks}) ORDER BY rowid", keys)
+        return [_record(r) for r in cur]
+
+    def iter_all(self) -> Iterator[IssueRecord]:
+        # Keyset pagination keeps memory flat and never holds a read cursor across yields.
+        last = 0
+        while True:
+            rows = self._conn().execute(
+                f"SELECT rowid, {_COLUMNS} FROM issues WHERE rowid > ? ORDER BY rowid LIMIT ?", (last, self.BATCH)
+            ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield _record(row[1:])
+            last = rows[-1][0]
+
+    def replace_all(self, issues: Iterable[Issue]) -> None:
+        with self._tx() as conn:
+            conn.execute("DELETE FROM issues")
+            conn.executemany(f"INSERT INTO issues ({_COLUMNS}) VALUES ({_PLACEHOLDERS})", (_row(i) for i in issues))
+
+    def rewrite(self, transform: Transform, before_commit: Optional[Callable[[], None]] = None) -> int:
+        """One write transaction; only rows the transform changed are written back."""
+        kept = 0
+        with self._tx() as conn:
+            last = 0
+            while True:
+                rows = conn.execute(
+                    f"SELECT rowid, {_COLUMNS} FROM issues WHERE rowid > ? ORDER BY rowid LIMIT ?", (last, self.BATCH)
+                ).fetchall()
+                if not rows:
+                    break
+                changed, dropped = [], []
+                for row in rows:
+                    before = _record(row[1:])
+                    after = transform(before.copy())
+                    if after is None:
+                        dropped.append((row[0],))
+                        continue
+                    kept += 1
+                    if after != before:
+                        changed.append(_row(after))
+                conn.executemany(_UPSERT, changed)
+                conn.executemany("DELETE FROM issues WHERE rowid = ?", dropped)
+                last = rows[-1][0]
+            if before_commit is not None:
+                before_commit()
+        return kept
+
+    def max_issue_number(self) -> int:
+        cur = self._conn().execute("SELECT issue_id FROM issues WHERE issue_id LIKE 'ISS%'")
+        return max((n for n in (issue_store.issue_number(r[0]) for r in cur) if n is not None), default=0)
+
+    def __len__(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM issues").fetchone()[0]
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT/ROLLBACK on an autocommit connection."""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+
+
+def make_backend(problems_file: str, sqlite_path: Optional[str] = None) -> IssueBackend:
+    """
+    Backend chosen by HELPDESK_STORAGE ("file", the default, or "sqlite").
+    A fresh SQLite database is seeded once from problems.txt so switching
+    backends does not lose existing tickets.
+    """
+    kind = os.getenv("HELPDESK_STORAGE", "file").strip().lower()
+    if kind != "sqlite":
+        return FlatFileBackend(problems_file)
+    db_path = sqlite_path or os.getenv("HELPDESK_SQLITE_PATH") or os.path.splitext(problems_file)[0] + ".db"
+    backend = SQLiteBackend(db_path)
+    if len(backend) == 0 and os.path.exists(problems_file):
+        backend.bulk_update(issue_store.iter_issues(problems_file))
+    return backend
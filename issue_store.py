@@ -0,0 +1,1247 @@
+"""
+Flat-file issue storage used by the MCP server (main.py).
+
+problems.txt keeps one pipe-delimited issue per line. New issues are appended
+as a single line; changes to existing issues are appended as full records to a
+journal next to it (problems.txt.journal). Readers merge both, so the newest
+record for an issue_id wins. compact() folds the journal back into the main
+file; write_issues() is a full rewrite and therefore compacts as well.
+
+All writers (this process's threads, the web agent, Django's MCP
+subprocesses) serialize on an advisory lock (problems.txt.lock); concurrent
+appends are group-committed into one write per batch.
+
+Issue ids come from a small counter file (problems.txt.seq) that Django also
+uses, so tickets created through either path share one ISSnnn sequence.
+
+process_issues remembers how far it has read (problems.txt.cursor), so an
+incremental run only parses what was appended since the previous one.
+Every full rewrite bumps problems.txt.gen, which tells in-memory indexes to
+reload even when the new file reused the old inode.
+"""
+import gzip
+import json
+import mmap
+import os
+import re
+import sys
+import threading
+import time
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+try:
+    import fcntl  # POSIX advisory locks
+except ImportError:  # Windows
+    fcntl = None  # type: ignore
+    import msvcrt  # type: ignore
+
+# fsync after every append/journal record. Off by default: a crash can then
+# lose the last few records, but intake stays a single buffered write.
+FSYNC_WRITES = os.getenv("HELPDESK_FSYNC", "0") == "1"
+# Fold the journal into the main file once it grows past this many bytes.
+JOURNAL_COMPACT_BYTES = int(os.getenv("HELPDESK_JOURNAL_COMPACT_BYTES", str(1024 * 1024)))
+# Compaction (and process_issues full=True) moves closed/resolved issues into the archive.
+ARCHIVE_CLOSED = os.getenv("HELPDESK_ARCHIVE_CLOSED", "1") == "1"
+
+
+# -----------------------------
+# Issue record
+# -----------------------------
+FIELDS = (
+    "issue_id",
+    "employee_id",
+    "description",
+    "category",
+    "subcategory",
+    "priority",
+    "status",
+    "assigned_expert_id",
+    "ai_solution",
+    "created_at",
+    "updated_at",
+)
+# Low-cardinality columns; interning lets every row share one string object.
+_INTERNED = frozenset({"employee_id", "category", "subcategory", "priority", "status", "assigned_expert_id"})
+_intern = sys.intern
+
+
+class IssueRecord(MutableMapping):
+    """
+    One ticket as a slotted object (roughly a quarter of the memory of the
+    equivalent 11-key dict). It also behaves like the old dict, so existing
+    callers can keep using issue.get("status"), issue["status"] = ... and
+    dict(issue); to_dict() gives a plain dict for JSON.
+    """
+
+    __slots__ = FIELDS
+
+    def __init__(
+        self,
+        issue_id: str = "",
+        employee_id: str = "",
+        description: str = "",
+        category: str = "",
+        subcategory: str = "",
+        priority: str = "",
+        status: str = "open",
+        assigned_expert_id: str = "",
+        ai_solution: str = "",
+        created_at: str = "",
+        updated_at: str = "",
+    ) -> None:
+        self.issue_id = issue_id
+        self.employee_id = _intern(employee_id)
+        self.description = description
+        self.category = _intern(category)
+        self.subcategory = _intern(subcategory)
+        self.priority = _intern(priority)
+        self.status = _intern(status)
+        self.assigned_expert_id = _intern(assigned_expert_id)
+        self.ai_solution = ai_solution
+        self.created_at = created_at
+        self.updated_at = updated_at
+
+    @classmethod
+    def from_mapping(cls, data) -> "IssueRecord":
+        if isinstance(data, IssueRecord):
+            return data.copy()
+        rec = cls()
+        for name in FIELDS:
+            if name in data:
+                rec[name] = data[name]
+        return rec
+
+    def copy(self) -> "IssueRecord":
+        rec = _new_record(IssueRecord)
+        for name in FIELDS:
+            setattr(rec, name, getattr(self, name))
+        return rec
+
+    def to_dict(self) -> Dict[str, str]:
+        return {name: getattr(self, name) for name in FIELDS}
+
+    # Mapping compatibility
+    def get(self, key, default=None):
+        if key in FIELDS:
+            return getattr(self, key)
+        return default
+
+    def __getitem__(self, key: str) -> str:
+        if key not in FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key: str, value: Optional[str]) -> None:
+        if key not in FIELDS:
+            raise KeyError(key)
+        value = "" if value is None else str(value)
+        setattr(self, key, _intern(value) if key in _INTERNED else value)
+
+    def __delitem__(self, key: str) -> None:
+        self[key] = "open" if key == "status" else ""
+
+    def __contains__(self, key) -> bool:
+        return key in FIELDS
+
+    def __iter__(self):
+        return iter(FIELDS)
+
+    def __len__(self) -> int:
+        return len(FIELDS)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, IssueRecord):
+            return all(getattr(self, n) == getattr(other, n) for n in FIELDS)
+        return super().__eq__(other)
+
+    def __repr__(self) -> str:
+        return f"IssueRecord({self.to_dict()!r})"
+
+
+_new_record = object.__new__
+
+# Anything the store accepts: a record or a plain dict with the same keys.
+Issue = Union[IssueRecord, Dict[str, Optional[str]]]
+
+
+# -----------------------------
+# Parsing / serialization
+# -----------------------------
+def parse_issue_line(line: str) -> IssueRecord:
+    parts = line.split("|")
+    n = len(parts)
+    if n < 11:
+        parts += [""] * (11 - n)
+    rec = _new_record(IssueRecord)
+    rec.issue_id = parts[0].strip()
+    rec.employee_id = _intern(parts[1].strip())
+    rec.description = parts[2].strip()
+    rec.category = _intern(parts[3].strip())
+    rec.subcategory = _intern(parts[4].strip())
+    rec.priority = _intern(parts[5].strip())
+    rec.status = _intern(parts[6].strip()) if n > 6 else "open"
+    rec.assigned_expert_id = _intern(parts[7].strip())
+    rec.ai_solution = parts[8].strip()
+    rec.created_at = parts[9].strip()
+    rec.updated_at = parts[10].strip()
+    return rec
+
+
+def serialize_issue(issue: Issue) -> str:
+    if isinstance(issue, IssueRecord):
+        return " | ".join((
+            issue.issue_id,
+            issue.employee_id,
+            issue.description,
+            issue.category,
+            issue.subcategory,
+            issue.priority,
+            issue.status,
+            issue.assigned_expert_id,
+            issue.ai_solution,
+            issue.created_at,
+            issue.updated_at,
+        ))
+    fields = [
+        issue.get("issue_id", ""),
+        issue.get("employee_id", ""),
+        issue.get("description", ""),
+        issue.get("category", ""),
+        issue.get("subcategory", ""),
+        issue.get("priority", ""),
+        issue.get("status", "open"),
+        issue.get("assigned_expert_id", ""),
+        issue.get("ai_solution", ""),
+        issue.get("created_at", ""),
+        issue.get("updated_at", ""),
+    ]
+    return " | ".join(fields)
+
+
+# -----------------------------
+# Low-level file helpers
+# -----------------------------
+def journal_path(path: str) -> str:
+    return path + ".journal"
+
+
+def seq_path(path: str) -> str:
+    return path + ".seq"
+
+
+def offsets_path(path: str) -> str:
+    return path + ".idx"
+
+
+def lock_path(path: str) -> str:
+    return path + ".lock"
+
+
+def cursor_path(path: str) -> str:
+    return path + ".cursor"
+
+
+def gen_path(path: str) -> str:
+    return path + ".gen"
+
+
+@contextmanager
+def _locked(f) -> Iterator[None]:
+    """Hold an exclusive advisory lock on an open file for the duration of the block."""
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class _StoreLock:
+    """
+    Exclusive lock over one problems.txt and its sidecars, held across
+    processes (advisory lock on problems.txt.lock) and threads. Re-entrant
+    within a thread, so e.g. a journal write may trigger compaction while
+    still holding it. A separate lock file is used because rewrites replace
+    problems.txt itself.
+    """
+
+    def __init__(self, path: str):
+        self.path = lock_path(path)
+        self._rlock = threading.RLock()
+        self._depth = 0
+        self._file = None
+        self._held = None
+        self._owner: Optional[int] = None
+
+    def owned(self) -> bool:
+        """True when the calling thread holds the lock."""
+        return self._owner == threading.get_ident()
+
+    def __enter__(self) -> "_StoreLock":
+        self._rlock.acquire()
+        if self._depth == 0:
+            try:
+                f = open(self.path, "a+")
+                self._held = _locked(f)
+                self._held.__enter__()
+                self._file = f
+            except BaseException:
+                self._rlock.release()
+                raise
+            self._owner = threading.get_ident()
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._depth -= 1
+        try:
+            if self._depth == 0:
+                self._owner = None
+            if self._depth == 0 and self._file is not None:
+                try:
+                    self._held.__exit__(None, None, None)
+                finally:
+                    self._file.close()
+                    self._file = None
+        finally:
+            self._rlock.release()
+
+
+_LOCKS: Dict[str, _StoreLock] = {}
+_LOCKS_GUARD = threading.Lock()
+
+
+def store_lock(path: str) -> _StoreLock:
+    """Process-wide re-entrant writer lock for `path` (see _StoreLock)."""
+    key = os.path.abspath(path)
+    with _LOCKS_GUARD:
+        lock = _LOCKS.get(key)
+        if lock is None:
+            lock = _LOCKS[key] = _StoreLock(key)
+        return lock
+
+
+def _stat(path: str) -> Optional[Tuple[int, int, int]]:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+def _read_from(path: str, offset: int, complete_only: bool = True) -> Tuple[List[str], int]:
+    """
+    Read non-empty lines starting at byte `offset`. Returns (lines, new_offset).
+    With complete_only, a trailing line without its newline (a writer mid-append)
+    is left for the next read.
+    """
+    try:
+        with open(path, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+    except FileNotFoundError:
+        return [], offset
+    if complete_only:
+        data = data[: data.rfind(b"\n") + 1]
+    lines = [l.strip() for l in data.decode("utf-8").splitlines()]
+    return [l for l in lines if l], offset + len(data)
+
+
+def _append_lines(path: str, lines: List[str]) -> List[Tuple[int, int]]:
+    """
+    Append lines with a single write; returns (byte offset, byte length) of
+    each record, newline excluded.
+    """
+    with open(path, "a+b") as f:
+        # Never glue a record onto a last line that lacks its newline.
+        end = f.seek(0, os.SEEK_END)
+        buf = bytearray()
+        if end > 0:
+            f.seek(end - 1)
+            if f.read(1) != b"\n":
+                buf += b"\n"
+        spans = []
+        for line in lines:
+            data = line.encode("utf-8")
+            spans.append((end + len(buf), len(data)))
+            buf += data + b"\n"
+        f.write(buf)
+        f.flush()
+        if FSYNC_WRITES:
+            os.fsync(f.fileno())
+    return spans
+
+
+def _append_line(path: str, line: str) -> Tuple[int, int]:
+    return _append_lines(path, [line])[0]
+
+
+def _iter_lines(path: str) -> Iterator[str]:
+    try:
+        f = open(path, "r", encoding="utf-8")
+    except FileNotFoundError:
+        return
+    with f:
+        for ln in f:
+            ln = ln.strip()
+            if ln:
+                yield ln
+
+
+def _replace_file(path: str, lines: Iterable[str], before_commit: Optional[Callable[[], None]] = None) -> int:
+    """
+    Write `lines` to a temp file and atomically rename it over `path`.
+    `before_commit` runs after the temp file is complete but before the rename.
+    Returns lines written.
+    """
+    tmp = path + ".tmp"
+    written = 0
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            for line in lines:
+                f.write(line + "\n")
+                written += 1
+            f.flush()
+            if FSYNC_WRITES:
+                os.fsync(f.fileno())
+        if before_commit is not None:
+            before_commit()
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return written
+
+
+def _drop_journal(path: str) -> None:
+    # Offsets and the processing cursor point into the old main file/journal, so they go too.
+    for stale in (journal_path(path), offsets_path(path), cursor_path(path)):
+        if os.path.exists(stale):
+            os.remove(stale)
+
+
+def rewrite_generation(path: str) -> int:
+    """
+    How many times the main file has been rewritten. A rewritten file can get
+    the old inode back (ext4 reuses them after os.replace), so inode + size
+    alone cannot tell a rewrite from an append. The <path>.gen sidecar grows
+    by one byte per rewrite, so this is a single stat.
+    """
+    st = _stat(gen_path(path))
+    return st[1] if st else 0
+
+
+def _bump_generation(path: str) -> None:
+    # Called with the store lock held, after the new main file and journal are in place.
+    with open(gen_path(path), "ab") as f:
+        f.write(b".")
+
+
+# -----------------------------
+# Issue IDs
+# -----------------------------
+_ISSUE_ID_RE = re.compile(r"^ISS(\d+)$")
+
+
+def format_issue_id(num: int) -> str:
+    return f"ISS{num:03d}"
+
+
+def issue_number(issue_id: Optional[str]) -> Optional[int]:
+    m = _ISSUE_ID_RE.match(issue_id or "")
+    return int(m.group(1)) if m else None
+
+
+def max_issue_number(issues) -> int:
+    nums = [issue_number(i.get("issue_id")) for i in issues]
+    return max((n for n in nums if n is not None), default=0)
+
+
+def allocate_issue_id(path: str, seed: Optional[Callable[[], int]] = None) -> str:
+    """
+    Hand out the next issue id from the counter in <path>.seq.
+
+    The counter is read-incremented-written under an exclusive file lock, so
+    the MCP server, the web agent and Django (which all point at the same
+    problems.txt) never receive the same id. `seed` returns the highest number
+    already in use and is only called once, when the counter does not exist yet;
+    by default it scans the issues in `path`.
+    """
+    fd = os.open(seq_path(path), os.O_RDWR | os.O_CREAT, 0o644)
+    with os.fdopen(fd, "r+", encoding="ascii") as f, _locked(f):
+        raw = f.read().strip()
+        if raw.isdigit():
+            last = int(raw)
+        else:
+            last = seed() if seed else max_issue_number(load_issues(path))
+        num = last + 1
+        f.seek(0)
+        f.write(str(num))
+        f.truncate()
+        f.flush()
+        if FSYNC_WRITES:
+            os.fsync(f.fileno())
+    return format_issue_id(num)
+
+
+# -----------------------------
+# In-memory index
+# -----------------------------
+class IssueIndex:
+    """
+    Parsed issues for one problems.txt, kept in memory for the whole process.
+
+    refresh() stats the main file, the journal and the rewrite generation.
+    Nothing is re-read when they are unchanged; lines appended since the last
+    read are parsed on their own; anything else (rewrite, compaction,
+    truncation) triggers a full reload. A secondary index maps status to
+    issue ids.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._issues: List[IssueRecord] = []
+        self._pos: Dict[str, int] = {}
+        self._by_status: Dict[str, Set[str]] = {}
+        self._main_sig: Optional[Tuple[int, int, int]] = None
+        self._main_off = 0
+        self._journal_sig: Optional[Tuple[int, int, int]] = None
+        self._journal_off = 0
+        self._gen = -1
+
+    @staticmethod
+    def _status_key(issue: IssueRecord) -> str:
+        return (issue.get("status") or "open").lower()
+
+    def _unlink(self, issue: IssueRecord) -> None:
+        iid = issue.get("issue_id") or ""
+        self._by_status.get(self._status_key(issue), set()).discard(iid)
+
+    def _link(self, issue: IssueRecord) -> None:
+        iid = issue.get("issue_id") or ""
+        self._by_status.setdefault(self._status_key(issue), set()).add(iid)
+
+    def _add(self, issue: IssueRecord) -> None:
+        self._pos[issue.get("issue_id") or ""] = len(self._issues)
+        self._issues.append(issue)
+        self._link(issue)
+
+    def _upsert(self, issue: IssueRecord) -> None:
+        iid = issue.get("issue_id") or ""
+        idx = self._pos.get(iid)
+        if idx is None:
+            self._add(issue)
+            return
+        self._unlink(self._issues[idx])
+        self._issues[idx] = issue
+        self._link(issue)
+
+    def _full_reload(self, gen, main_sig, journal_sig) -> None:
+        self._reset()
+        self._gen = gen
+        lines, self._main_off = _read_from(self.path, 0, complete_only=False)
+        for line in lines:
+            self._add(parse_issue_line(line))
+        lines, self._journal_off = _read_from(journal_path(self.path), 0, complete_only=False)
+        for line in lines:
+            self._upsert(parse_issue_line(line))
+        self._main_sig, self._journal_sig = main_sig, journal_sig
+
+    @staticmethod
+    def _appended(old, new, consumed: int) -> bool:
+        """True if `new` is `old` with only bytes added after `consumed`."""
+        return old is not None and new is not None and old[0] == new[0] and new[1] >= consumed
+
+    def refresh(self) -> None:
+        with self._lock:
+            # Generation first: a rewrite landing after this read is caught by the next refresh.
+            gen = rewrite_generation(self.path)
+            main_sig = _stat(self.path)
+            journal_sig = _stat(journal_path(self.path))
+            if gen == self._gen and main_sig == self._main_sig and journal_sig == self._journal_sig:
+                return
+            main_ok = gen == self._gen and (main_sig == self._main_sig or self._appended(self._main_sig, main_sig, self._main_off))
+            journal_ok = (
+                journal_sig == self._journal_sig
+                or (self._journal_sig is None and journal_sig is not None)
+                or self._appended(self._journal_sig, journal_sig, self._journal_off)
+            )
+            if not (main_ok and journal_ok):
+                self._full_reload(gen, main_sig, journal_sig)
+                return
+            if main_sig != self._main_sig:
+                lines, self._main_off = _read_from(self.path, self._main_off)
+                for line in lines:
+                    self._add(parse_issue_line(line))
+                self._main_sig = main_sig
+            if journal_sig != self._journal_sig:
+                if self._journal_sig is None:
+                    self._journal_off = 0
+                lines, self._journal_off = _read_from(journal_path(self.path), self._journal_off)
+                for line in lines:
+                    self._upsert(parse_issue_line(line))
+                self._journal_sig = journal_sig
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._reset()
+
+    # Readers return copies so callers can mutate freely without touching the index.
+    def issues(self) -> List[IssueRecord]:
+        with self._lock:
+            self.refresh()
+            return [i.copy() for i in self._issues]
+
+    def get(self, issue_id: str) -> Optional[IssueRecord]:
+        with self._lock:
+            self.refresh()
+            idx = self._pos.get(issue_id)
+            return self._issues[idx].copy() if idx is not None else None
+
+    def _select(self, ids: Set[str]) -> List[IssueRecord]:
+        return [self._issues[i].copy() for i in sorted(self._pos[iid] for iid in ids)]
+
+    def with_status(self, *statuses: str) -> List[IssueRecord]:
+        with self._lock:
+            self.refresh()
+            ids: Set[str] = set()
+            for st in statuses:
+                ids |= self._by_status.get((st or "open").lower(), set())
+            return self._select(ids)
+
+    def __len__(self) -> int:
+        with self._lock:
+            self.refresh()
+            return len(self._issues)
+
+
+_INDEXES: Dict[str, IssueIndex] = {}
+_INDEXES_LOCK = threading.Lock()
+
+
+def get_index(path: str) -> IssueIndex:
+    """Process-wide IssueIndex for `path`."""
+    key = os.path.abspath(path)
+    with _INDEXES_LOCK:
+        idx = _INDEXES.get(key)
+        if idx is None:
+            idx = _INDEXES[key] = IssueIndex(key)
+        return idx
+
+
+# -----------------------------
+# Byte-offset index
+# -----------------------------
+_MAIN, _JOURNAL = "m", "j"
+
+
+class OffsetIndex:
+    """
+    issue_id -> (file, byte offset, byte length) of the newest record, kept in
+    the sidecar problems.txt.idx so single-issue reads and patches never parse
+    the whole file.
+
+    append_issue()/journal_update() add one sidecar line per record. Entries
+    missing from the sidecar (e.g. lines written by older code) are picked up
+    by scanning only the bytes past what the sidecar already covers. Every
+    lookup is checked against the bytes it points at; a mismatch, or the
+    sidecar disappearing after a rewrite, rebuilds it from scratch.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.RLock()
+        self._gen = -1
+        self._reset()
+
+    def _reset(self) -> None:
+        self._entries: Dict[str, Tuple[str, int, int]] = {}
+        self._covered = {_MAIN: 0, _JOURNAL: 0}
+        self._sidecar_sig: Optional[Tuple[int, int, int]] = None
+        self._sidecar_off = 0
+
+    def _source_path(self, source: str) -> str:
+        return journal_path(self.path) if source == _JOURNAL else self.path
+
+    def _remember(self, issue_id: str, source: str, offset: int, length: int) -> None:
+        self._entries[issue_id] = (source, offset, length)
+        # Only extend coverage over contiguous records (+1 allows a repaired missing newline),
+        # so lines written before the sidecar existed are still found by _scan_uncovered.
+        if offset <= self._covered[source] + 1:
+            self._covered[source] = max(self._covered[source], offset + length + 1)
+
+    def _sync_sidecar(self) -> None:
+        gen = rewrite_generation(self.path)
+        if gen != self._gen:
+            self._reset()
+            self._gen = gen
+        sig = _stat(offsets_path(self.path))
+        if sig == self._sidecar_sig:
+            return
+        if sig is None or self._sidecar_sig is None or sig[0] != self._sidecar_sig[0] or sig[1] < self._sidecar_off:
+            self._reset()
+        lines, self._sidecar_off = _read_from(offsets_path(self.path), self._sidecar_off)
+        for line in lines:
+            parts = line.split()
+            if len(parts) == 4 and parts[1] in self._covered:
+                self._remember(parts[0], parts[1], int(parts[2]), int(parts[3]))
+        self._sidecar_sig = _stat(offsets_path(self.path))
+
+    def record(self, source: str, entries: List[Tuple[str, Tuple[int, int]]]) -> None:
+        """Add (issue_id, (offset, length)) entries for records just appended to `source`."""
+        with self._lock:
+            self._sync_sidecar()
+            _append_lines(offsets_path(self.path), [f"{iid} {source} {off} {ln}" for iid, (off, ln) in entries])
+            for iid, (off, ln) in entries:
+                self._remember(iid, source, off, ln)
+
+    def _scan_uncovered(self) -> None:
+        """Index lines past the covered prefix of the main file, then of the journal."""
+        new_lines: List[str] = []
+        for source in (_MAIN, _JOURNAL):
+            fpath = self._source_path(source)
+            size = (_stat(fpath) or (0, 0, 0))[1]
+            start = self._covered[source]
+            if size <= start:
+                continue
+            with open(fpath, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                pos = start
+                while pos < size:
+                    nl = m.find(b"\n", pos)
+                    end = size if nl < 0 else nl
+                    raw = m[pos:end]
+                    stripped = raw.strip()
+                    if stripped:
+                        iid = stripped.split(b"|", 1)[0].strip().decode("utf-8")
+                        offset = pos + (len(raw) - len(raw.lstrip()))
+                        new_lines.append(f"{iid} {source} {offset} {len(raw.strip())}")
+                        self._remember(iid, source, offset, len(raw.strip()))
+                    pos = end + 1
+        if new_lines:
+            _append_lines(offsets_path(self.path), new_lines)
+            self._sidecar_sig = _stat(offsets_path(self.path))
+            self._sidecar_off = self._sidecar_sig[1] if self._sidecar_sig else 0
+
+    def _read_entry(self, issue_id: str) -> Optional[IssueRecord]:
+        entry = self._entries.get(issue_id)
+        if entry is None:
+            return None
+        source, offset, length = entry
+        try:
+            with open(self._source_path(source), "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                raw = m[offset:offset + length] if offset + length <= len(m) else b""
+        except (FileNotFoundError, ValueError):
+            raw = b""
+        head, sep, _ = raw.partition(b"|")
+        if not sep or head.strip().decode("utf-8", "replace") != issue_id:
+            raise LookupError(issue_id)
+        return parse_issue_line(raw.decode("utf-8"))
+
+    def rebuild(self) -> None:
+        with self._lock:
+            if os.path.exists(offsets_path(self.path)):
+                os.remove(offsets_path(self.path))
+            self._reset()
+            self._scan_uncovered()
+
+    def lookup(self, issue_id: str) -> Optional[IssueRecord]:
+        with self._lock:
+            self._sync_sidecar()
+            try:
+                found = self._read_entry(issue_id)
+            except LookupError:
+                found = None
+            if found is not None:
+                return found
+        # Miss or stale entry: scan under the writer lock so offsets cannot move underneath us.
+        with store_lock(self.path), self._lock:
+            self._sync_sidecar()
+            try:
+                self._scan_uncovered()
+                return self._read_entry(issue_id)
+            except LookupError:
+                self.rebuild()
+                try:
+                    return self._read_entry(issue_id)
+                except LookupError:
+                    return None
+
+
+_OFFSETS: Dict[str, OffsetIndex] = {}
+
+
+def get_offset_index(path: str) -> OffsetIndex:
+    """Process-wide OffsetIndex for `path`."""
+    key = os.path.abspath(path)
+    with _INDEXES_LOCK:
+        idx = _OFFSETS.get(key)
+        if idx is None:
+            idx = _OFFSETS[key] = OffsetIndex(key)
+        return idx
+
+
+# -----------------------------
+# Group commit
+# -----------------------------
+# Optional wait (ms) before a leader flushes, to let more writers join its batch.
+GROUP_COMMIT_WINDOW_MS = float(os.getenv("HELPDESK_GROUP_COMMIT_MS", "0"))
+
+
+class _PendingWrite:
+    __slots__ = ("source", "entries", "spans", "error", "done")
+
+    def __init__(self, source: str, entries: List[Tuple[str, str]]):
+        self.source = source
+        self.entries = entries  # (issue_id, serialized line)
+        self.spans: List[Tuple[int, int]] = []
+        self.error: Optional[BaseException] = None
+        self.done = False
+
+
+class GroupCommitWriter:
+    """
+    Batches appends from concurrent threads. The first writer to arrive while
+    no flush is running becomes the leader: it takes every queued request,
+    writes them with one append (and one fsync) per file under the store
+    lock, updates the offset index, and wakes the others. Writers that arrive
+    during a flush queue up and go out together in the next one, so bursts
+    cost one write per batch instead of one per ticket.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._cv = threading.Condition()
+        self._queue: List[_PendingWrite] = []
+        self._flushing = False
+        self.batches = 0
+        self.records = 0
+
+    def submit(self, source: str, entries: List[Tuple[str, str]]) -> List[Tuple[int, int]]:
+        req = _PendingWrite(source, entries)
+        if store_lock(self.path).owned():
+            # The caller holds the store lock for a read-modify-write (patch_issue,
+            # commit_pending). The current leader may be waiting for that lock in
+            # _flush, so queueing behind it would deadlock: write directly instead.
+            self._flush([req])
+            if req.error is not None:
+                raise req.error
+            return req.spans
+        with self._cv:
+            self._queue.append(req)
+            while self._flushing and not req.done:
+                self._cv.wait()
+            batch = None
+            if not req.done:
+                self._flushing = True
+                batch, self._queue = self._queue, []
+        if batch is not None:
+            try:
+                if GROUP_COMMIT_WINDOW_MS > 0:
+                    time.sleep(GROUP_COMMIT_WINDOW_MS / 1000.0)
+                    with self._cv:
+                        batch += self._queue
+                        self._queue = []
+                self._flush(batch)
+            finally:
+                with self._cv:
+                    self._flushing = False
+                    self._cv.notify_all()
+        if req.error is not None:
+            raise req.error
+        return req.spans
+
+    def _flush(self, batch: List[_PendingWrite]) -> None:
+        try:
+            with store_lock(self.path):
+                for source in (_MAIN, _JOURNAL):
+                    reqs = [r for r in batch if r.source == source]
+                    if not reqs:
+                        continue
+                    target = journal_path(self.path) if source == _JOURNAL else self.path
+                    spans = _append_lines(target, [line for r in reqs for _, line in r.entries])
+                    ids = [iid for r in reqs for iid, _ in r.entries]
+                    get_offset_index(self.path).record(source, list(zip(ids, spans)))
+                    for r in reqs:
+                        r.spans, spans = spans[: len(r.entries)], spans[len(r.entries):]
+            self.batches += 1
+            self.records += sum(len(r.entries) for r in batch)
+        except BaseException as e:
+            for r in batch:
+                r.error = e
+        finally:
+            for r in batch:
+                r.done = True
+
+
+_WRITERS: Dict[str, GroupCommitWriter] = {}
+
+
+def get_writer(path: str) -> GroupCommitWriter:
+    """Process-wide GroupCommitWriter for `path`."""
+    key = os.path.abspath(path)
+    with _INDEXES_LOCK:
+        writer = _WRITERS.get(key)
+        if writer is None:
+            writer = _WRITERS[key] = GroupCommitWriter(key)
+        return writer
+
+
+# -----------------------------
+# Archive of closed issues
+# -----------------------------
+# Statuses that leave the hot file for the compressed archive.
+ARCHIVED_STATUSES = frozenset({"closed", "resolved"})
+_MONTH_RE = re.compile(r"^\d{4}-\d{2}")
+
+
+def archive_dir(path: str) -> str:
+    return path + ".archive"
+
+
+def _archive_partition(issue: Issue) -> str:
+    """Month segment (YYYY-MM) an issue is filed under: when it was last updated."""
+    stamp = issue.get("updated_at") or issue.get("created_at") or ""
+    m = _MONTH_RE.match(stamp)
+    return m.group(0) if m else time.strftime("%Y-%m")
+
+
+class ArchiveWriter:
+    """
+    Appends issues to gzip segments <problems.txt>.archive/YYYY-MM.txt.gz.
+    Each run adds a new gzip member to the segment, which gzip readers
+    concatenate transparently. Call flush() (or leave the with-block) before
+    the hot file drops the archived lines, so a crash can at worst duplicate
+    an issue in the archive, never lose it; readers keep the newest copy.
+    """
+
+    def __init__(self, path: str):
+        self.dir = archive_dir(path)
+        self._open: Dict[str, gzip.GzipFile] = {}
+        self.count = 0
+
+    def add(self, issue: Issue) -> None:
+        part = _archive_partition(issue)
+        f = self._open.get(part)
+        if f is None:
+            os.makedirs(self.dir, exist_ok=True)
+            f = self._open[part] = gzip.open(os.path.join(self.dir, f"{part}.txt.gz"), "ab")
+        f.write(serialize_issue(issue).encode("utf-8") + b"\n")
+        self.count += 1
+
+    def flush(self) -> None:
+        for f in self._open.values():
+            f.close()
+            if FSYNC_WRITES:
+                with open(f.name, "rb") as raw:
+                    os.fsync(raw.fileno())
+        self._open = {}
+
+    def __enter__(self) -> "ArchiveWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.flush()
+
+
+def archive_if_closed(issue: IssueRecord, archive: Optional[ArchiveWriter]) -> Optional[IssueRecord]:
+    """Rewrite transform: hand a closed/resolved issue to `archive` and drop it (None); keep anything else."""
+    if archive is not None and (issue.get("status") or "").lower() in ARCHIVED_STATUSES:
+        archive.add(issue)
+        return None
+    return issue
+
+
+def archive_segments(path: str) -> List[str]:
+    """Archive segment months, oldest first."""
+    try:
+        names = os.listdir(archive_dir(path))
+    except FileNotFoundError:
+        return []
+    return sorted(n[: -len(".txt.gz")] for n in names if n.endswith(".txt.gz"))
+
+
+def iter_archived(path: str, months: Optional[Iterable[str]] = None) -> Iterator[IssueRecord]:
+    """Stream archived records (optionally only some YYYY-MM segments), oldest segment first."""
+    wanted = set(months) if months is not None else None
+    for month in archive_segments(path):
+        if wanted is not None and month not in wanted:
+            continue
+        with gzip.open(os.path.join(archive_dir(path), f"{month}.txt.gz"), "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield parse_issue_line(line)
+
+
+def search_archive(
+    path: str,
+    query: str = "",
+    issue_id: str = "",
+    employee_id: str = "",
+    months: Optional[Iterable[str]] = None,
+    limit: int = 50,
+) -> List[IssueRecord]:
+    """
+    Find archived issues. `query` is a case-insensitive substring of the
+    description or AI solution; issue_id/employee_id must match exactly.
+    Returns the newest copy of each match, most recent last.
+    """
+    needle = (query or "").casefold()
+    issue_id = (issue_id or "").strip()
+    employee_id = (employee_id or "").strip()
+    hits: Dict[str, IssueRecord] = {}
+    for rec in iter_archived(path, months):
+        if issue_id and rec.issue_id != issue_id:
+            continue
+        if employee_id and rec.employee_id != employee_id:
+            continue
+        if needle and needle not in rec.description.casefold() and needle not in rec.ai_solution.casefold():
+            continue
+        hits.pop(rec.issue_id, None)
+        hits[rec.issue_id] = rec
+    found = list(hits.values())
+    return found[-limit:] if limit else found
+
+
+# -----------------------------
+# Processing cursor
+# -----------------------------
+class Cursor:
+    """
+    How far process_issues has read: (inode, byte offset) of the main file and
+    of the journal, plus the ids that were still actionable after that run.
+    Persisted as JSON in <path>.cursor; any rewrite of the main file drops it.
+    """
+
+    __slots__ = ("main", "journal", "open_ids")
+
+    def __init__(self, main: Tuple[int, int], journal: Tuple[Optional[int], int], open_ids: Iterable[str] = ()):
+        self.main = main
+        self.journal = journal
+        self.open_ids = list(open_ids)
+
+    @classmethod
+    def current(cls, path: str) -> Optional["Cursor"]:
+        """A cursor at the current end of both files (None if the main file is missing)."""
+        main, journal = _stat(path), _stat(journal_path(path))
+        if main is None:
+            return None
+        return cls((main[0], main[1]), (journal[0], journal[1]) if journal else (None, 0))
+
+    @classmethod
+    def load(cls, path: str) -> Optional["Cursor"]:
+        try:
+            with open(cursor_path(path), "r", encoding="utf-8") as f:
+                raw = json.load(f)
+            return cls(tuple(raw["main"]), tuple(raw["journal"]), raw.get("open", []))
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def save(self, path: str) -> None:
+        with store_lock(path):
+            # A rewrite since this cursor was taken makes its offsets meaningless.
+            main = _stat(path)
+            if main is None or main[0] != self.main[0]:
+                return
+            tmp = cursor_path(path) + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"main": list(self.main), "journal": list(self.journal), "open": self.open_ids}, f)
+            os.replace(tmp, cursor_path(path))
+
+
+def pending_issues(path: str, statuses: Iterable[str]) -> Tuple[List[IssueRecord], int, Optional[Cursor]]:
+    """
+    Issues whose status is in `statuses` that appeared or changed since the
+    saved cursor, plus the ids the cursor still lists as open. Only the bytes
+    appended since then are parsed, so a run costs O(new records + open
+    issues) instead of O(all issues).
+
+    Without a usable cursor (first run, or the main file was rewritten) this
+    falls back to the in-memory status index. Returns (issues, records
+    scanned, cursor to save once the issues are processed).
+    """
+    wanted = {(s or "open").lower() for s in statuses}
+    saved = Cursor.load(path)
+    cursor = Cursor.current(path)
+    if cursor is None:
+        return [], 0, None
+    journal_ino = cursor.journal[0]
+    usable = (
+        saved is not None
+        and saved.main[0] == cursor.main[0]
+        and saved.main[1] <= cursor.main[1]
+        and saved.journal[0] in (None, journal_ino)
+        and saved.journal[1] <= cursor.journal[1]
+    )
+    if not usable:
+        # The cursor was taken before this read, so anything appended meanwhile is simply seen again next run.
+        index = get_index(path)
+        return index.with_status(*wanted), len(index), cursor
+
+    found: Dict[str, IssueRecord] = {}
+    scanned = 0
+    main_lines, main_end = _read_from(path, saved.main[1])
+    journal_start = saved.journal[1] if saved.journal[0] is not None else 0
+    journal_lines, journal_end = _read_from(journal_path(path), journal_start)
+    for line in main_lines + journal_lines:
+        rec = parse_issue_line(line)
+        found[rec.issue_id] = rec
+        scanned += 1
+    for issue_id in saved.open_ids:
+        if issue_id not in found:
+            rec = get_issue(path, issue_id)
+            scanned += 1
+            if rec is not None:
+                found[issue_id] = rec
+    # Resume after the last complete line read; a half-written record is read next run.
+    cursor.main = (cursor.main[0], main_end)
+    cursor.journal = (journal_ino, journal_end)
+    issues = [r for r in found.values() if (r.status or "open").lower() in wanted]
+    return issues, scanned, cursor
+
+
+# -----------------------------
+# Public API
+# -----------------------------
+def load_issues(path: str) -> List[IssueRecord]:
+    """Return the merged view: main file with journaled updates applied in order."""
+    return get_index(path).issues()
+
+
+def iter_issues(path: str) -> Iterator[IssueRecord]:
+    """
+    Stream the merged view one record at a time, in file order.
+
+    Only the journal (bounded by JOURNAL_COMPACT_BYTES) is held in memory;
+    the main file is read line by line, so memory does not grow with it.
+    """
+    pending: Dict[str, IssueRecord] = {}
+    for line in _iter_lines(journal_path(path)):
+        rec = parse_issue_line(line)
+        pending[rec.issue_id] = rec
+    for line in _iter_lines(path):
+        rec = parse_issue_line(line)
+        yield pending.pop(rec.issue_id, rec)
+    yield from pending.values()
+
+
+def rewrite_issues(
+    path: str,
+    transform: Callable[[IssueRecord], Optional[IssueRecord]],
+    before_commit: Optional[Callable[[], None]] = None,
+) -> int:
+    """
+    Stream every issue through `transform` into a temp file, then atomically
+    swap it in and drop the journal. Returning None from `transform` removes
+    the issue; `before_commit` runs just before the swap (e.g. to flush an
+    ArchiveWriter). Returns the number of issues written.
+    """
+    # Held for the whole pass so no append lands between our read and the rename.
+    with store_lock(path):
+        written = _replace_file(
+            path,
+            (serialize_issue(out) for out in map(transform, iter_issues(path)) if out is not None),
+            before_commit,
+        )
+        _drop_journal(path)
+        _bump_generation(path)
+    return written
+
+
+def write_issues(path: str, issues: Iterable[Issue]) -> None:
+    """Rewrite the main file with the given issues and drop the journal."""
+    with store_lock(path):
+        _replace_file(path, (serialize_issue(i) for i in issues))
+        _drop_journal(path)
+        _bump_generation(path)
+
+
+def append_issue(path: str, issue: Issue) -> None:
+    """Persist a brand-new issue as one appended line (group-committed with concurrent writers)."""
+    get_writer(path).submit(_MAIN, [(issue.get("issue_id") or "", serialize_issue(issue))])
+
+
+def journal_update(path: str, issue: Issue) -> None:
+    """Record a changed issue in the journal; compaction folds it in later."""
+    journal_updates(path, [issue])
+
+
+def journal_updates(path: str, issues: Iterable[Issue]) -> int:
+    """Journal several changed issues with one append. Returns the number recorded."""
+    issues = list(issues)
+    if issues:
+        _journal_and_maybe_compact(path, issues)
+    return len(issues)
+
+
+def _journal_and_maybe_compact(path: str, issues: List[Issue]) -> List[Tuple[int, int]]:
+    spans = get_writer(path).submit(_JOURNAL, [(i.get("issue_id") or "", serialize_issue(i)) for i in issues])
+    try:
+        if os.path.getsize(journal_path(path)) >= JOURNAL_COMPACT_BYTES:
+            compact(path)
+    except OSError:
+        pass
+    return spans
+
+
+def commit_pending(path: str, cursor: Optional[Cursor], issues: Iterable[Issue], open_ids: Iterable[str]) -> int:
+    """
+    Journal the issues a pending_issues() run changed and save its cursor.
+    When our records landed right where the cursor stops (nobody appended in
+    between), the cursor moves past them so the next run does not re-read
+    its own writes. Returns the number of issues journaled.
+    """
+    issues = list(issues)
+    if issues:
+        spans = _journal_and_maybe_compact(path, issues)
+        jstat = _stat(journal_path(path))
+        if cursor is not None and jstat is not None and spans[0][0] == cursor.journal[1]:
+            cursor.journal = (jstat[0], spans[-1][0] + spans[-1][1] + 1)
+    if cursor is not None:
+        cursor.open_ids = list(open_ids)
+        cursor.save(path)
+    return len(issues)
+
+
+def get_issue(path: str, issue_id: str) -> Optional[IssueRecord]:
+    """Fetch one issue through the offset index (no full parse)."""
+    return get_offset_index(path).lookup((issue_id or "").strip())
+
+
+def patch_issue(path: str, issue_id: str, **changes: str) -> Optional[IssueRecord]:
+    """Apply field changes to one issue as a single journal record. Returns the new record."""
+    with store_lock(path):
+        issue = get_issue(path, issue_id)
+        if issue is None:
+            return None
+        for key, value in changes.items():
+            issue[key] = value
+        journal_update(path, issue)
+    return issue
+
+
+def compact(path: str) -> int:
+    """
+    Fold journaled updates into the main file and, with ARCHIVE_CLOSED, move
+    closed/resolved issues into the archive in the same pass. Returns the
+    number of issues written.
+    """
+    if not os.path.exists(journal_path(path)):
+        return 0
+    with ArchiveWriter(path) as archive:
+        target = archive if ARCHIVE_CLOSED else None
+        return rewrite_issues(path, lambda rec: archive_if_closed(rec, target), archive.flush)
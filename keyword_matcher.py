@@ -0,0 +1,93 @@
+"""
+Single-pass keyword matching for the local classifiers.
+
+A KeywordMatcher is built once from named keyword groups ("network": [...],
+"vpn": [...]) and compiled into one regular expression. hits(text) scans the
+text once and returns the names of every group that has at least one keyword
+occurring in it, which is exactly what the old chains of
+`any(k in text for k in [...])` checks computed one group at a time.
+"""
+import re
+from typing import Dict, FrozenSet, Iterable, List, Mapping, Set
+
+
+class KeywordMatcher:
+    """
+    Plain substring semantics in one scan: the pattern is a zero-width
+    lookahead over every keyword, laid out as a prefix trie so shared
+    prefixes are tried once, and each text position reports the longest
+    keyword starting there. Keywords that are prefixes of
+    that one (e.g. "don" inside "donuyor") are credited through a
+    precomputed table, and keywords starting later are found at their own
+    positions.
+    """
+
+    def __init__(self, groups: Mapping[str, Iterable[str]]):
+        tags: Dict[str, Set[str]] = {}
+        for name, keywords in groups.items():
+            for kw in keywords:
+                kw = kw.lower()
+                if kw:
+                    tags.setdefault(kw, set()).add(name)
+        self.groups = {name: frozenset(k.lower() for k in kws if k) for name, kws in groups.items()}
+        # Every keyword also counts as a hit for the keywords that are its prefixes.
+        self._tags: Dict[str, FrozenSet[str]] = {
+            kw: frozenset(t for other, names in tags.items() if kw.startswith(other) for t in names) for kw in tags
+        }
+        self._pattern = re.compile("(?=(" + _trie_pattern(tags) + "))") if tags else None
+
+    def hits(self, text: str) -> FrozenSet[str]:
+        """Names of all groups with a keyword in `text` (lower-cased here)."""
+        if self._pattern is None or not text:
+            return frozenset()
+        found: Set[str] = set()
+        tags = self._tags
+        for kw in set(self._pattern.findall(text.lower())):
+            found |= tags[kw]
+        return frozenset(found)
+
+    def hits_many(self, texts: Iterable[str]) -> List[FrozenSet[str]]:
+        """
+        hits() for a batch. Each text is lower-cased once, repeated texts are
+        scanned once, and the compiled pattern is looked up once for the batch.
+        """
+        if self._pattern is None:
+            return [frozenset() for _ in texts]
+        findall = self._pattern.findall
+        tags = self._tags
+        seen: Dict[str, FrozenSet[str]] = {}
+        out: List[FrozenSet[str]] = []
+        for text in texts:
+            key = (text or "").lower()
+            found = seen.get(key)
+            if found is None:
+                acc: Set[str] = set()
+                for kw in set(findall(key)):
+                    acc |= tags[kw]
+                found = seen[key] = frozenset(acc)
+            out.append(found)
+        return out
+
+
+def _trie_pattern(keywords: Iterable[str]) -> str:
+    """
+    Regex for "any of `keywords`" shaped as a prefix trie, e.g. don, donuyor,
+    disk -> d(?:isk|on(?:uyor)?). Greedy optional tails make the longest
+    keyword at a position win. Python's re does not factor alternations
+    itself, and a flat list costs about three times as much per scan.
+    """
+    trie: Dict[str, dict] = {}
+    for kw in keywords:
+        node = trie
+        for ch in kw:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node: Dict[str, dict]) -> str:
+        alts = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not alts:
+            return ""
+        body = alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+        return "(?:" + body + ")?" if "" in node else body
+
+    return build(trie)
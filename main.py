@@ -1,10 +1,17 @@
 from mcp.server.fastmcp import FastMCP
 import os
 import sys
+import threading
+import time
 from datetime import datetime
-from typing import List, Dict, Optional, Tuple
+from typing import FrozenSet, Iterable, List, Dict, Optional, Tuple
 import json
-import re
+
+import classification_rules
+import dispatch_queue
+import expert_router
+import issue_backends
+import issue_store
 
 # Try to initialize Django for expert DB access. Falls back to JSON if unavailable.
 try:
@@ -15,7 +22,10 @@ try:
     import django  # type: ignore
     django.setup()
     from django.db import transaction  # type: ignore
-    from issues.models import Expert as DjangoExpert  # type: ignore
+    from django.db.models import Count, F, Max, Value  # type: ignore
+    from django.db.models.functions import Greatest  # type: ignore
+    from django.utils import timezone as django_timezone  # type: ignore
+    from issues.models import Expert as DjangoExpert, Issue as DjangoIssue  # type: ignore
     _DJANGO_READY = True
 except Exception:
     _DJANGO_READY = False
@@ -82,44 +92,23 @@ def _load_experts_from_json() -> List[Dict]:
 # -----------------------------
 # Loaders, parsers, serializers
 # -----------------------------
-Issue = Dict[str, Optional[str]]
-
-
-def parse_issue_line(line: str) -> Issue: # This function parses the issue line and returns a dictionary
-    parts = [p.strip() for p in line.strip().split("|")]
-    while len(parts) < 6:
-        parts.append("")
-    base = {
-        "issue_id": parts[0] if len(parts) > 0 else "",
-        "employee_id": parts[1] if len(parts) > 1 else "",
-        "description": parts[2] if len(parts) > 2 else "",
-        "category": parts[3] if len(parts) > 3 else "",
-        "subcategory": parts[4] if len(parts) > 4 else "",
-        "priority": parts[5] if len(parts) > 5 else "",
-    }
-    base["status"] = parts[6] if len(parts) > 6 else "open"
-    base["assigned_expert_id"] = parts[7] if len(parts) > 7 else ""
-    base["ai_solution"] = parts[8] if len(parts) > 8 else ""
-    base["created_at"] = parts[9] if len(parts) > 9 else ""
-    base["updated_at"] = parts[10] if len(parts) > 10 else ""
-    return base
-
-
-def serialize_issue(issue: Issue) -> str: # This function serializes the issue and returns a string
-    fields = [
-        issue.get("issue_id", ""),
-        issue.get("employee_id", ""),
-        issue.get("description", ""),
-        issue.get("category", ""),
-        issue.get("subcategory", ""),
-        issue.get("priority", ""),
-        issue.get("status", "open"),
-        issue.get("assigned_expert_id", ""),
-        issue.get("ai_solution", ""), # This is the AI solution for the issue
-        issue.get("created_at", ""),
-        issue.get("updated_at", ""),
-    ]
-    return " | ".join(fields)
+Issue = issue_store.Issue
+IssueRecord = issue_store.IssueRecord
+parse_issue_line = issue_store.parse_issue_line
+serialize_issue = issue_store.serialize_issue
+
+# problems.txt by default; HELPDESK_STORAGE=sqlite switches to an embedded SQLite DB
+STORE: issue_backends.IssueBackend = issue_backends.make_backend(PROBLEMS_FILE)
+# Compaction and process_issues(full=True) move closed issues into gzip month segments (problems.txt.archive/)
+ARCHIVE_CLOSED = issue_store.ARCHIVE_CLOSED
+# How often (seconds) the expert directory asks whether experts changed in the DB / JSON file
+EXPERTS_CHECK_SECONDS = float(os.getenv("HELPDESK_EXPERTS_CHECK_SECONDS", "2"))
+# Seconds between background attempts to dispatch queued issues when the server runs (0 = events only)
+DISPATCH_TICK_SECONDS = float(os.getenv("HELPDESK_DISPATCH_TICK_SECONDS", "30"))
+# An issue in one of these statuses counts towards its expert's current_load
+BUSY_STATUSES = ("assigned", "in_progress")
+# HELPDESK_LOG_THROUGHPUT=1 logs timings of classify_many/solve_many/triage batches to stderr
+LOG_THROUGHPUT = os.getenv("HELPDESK_LOG_THROUGHPUT", "0") == "1"
 
 
 def load_experts() -> List[Dict]:
@@ -134,6 +123,8 @@ def load_experts() -> List[Dict]:
                     "contact": e.contact,
                     "availability": bool(e.availability),
                     "current_load": int(e.current_load or 0),
+                    "capacity": e.capacity,
+                    "weight": int(e.weight or 1),
                 }
                 for e in DjangoExpert.objects.all()
             ]
@@ -142,76 +133,114 @@ def load_experts() -> List[Dict]:
     return _load_experts_from_json()
 
 
-def mark_expert_assigned(expert_id: str) -> None:
-    """Best-effort bump of current_load when we assign an expert (DB only)."""
-    if not _DJANGO_READY:
+def experts_stamp() -> Tuple:
+    """Cheap "did the experts change?" probe: row count + newest updated_at, or the JSON file's mtime/size."""
+    if _DJANGO_READY:
+        try:
+            agg = DjangoExpert.objects.aggregate(n=Count("pk"), latest=Max("updated_at"))
+            return ("db", agg["n"], agg["latest"])
+        except Exception:
+            pass
+    try:
+        st = os.stat(EXPERTS_FILE)
+        return ("json", st.st_mtime_ns, st.st_size)
+    except OSError:
+        return ("json", None)
+
+
+def apply_expert_loads(increments: Dict[str, int]) -> None:
+    """
+    Best-effort: add each expert's new assignments (negative when released) to
+    current_load in one transaction, as UPDATE ... SET current_load =
+    MAX(current_load + n, 0) (one statement per distinct n). DB only.
+    """
+    increments = {k: n for k, n in increments.items() if k and n}
+    if not _DJANGO_READY or not increments:
         return
+    by_amount: Dict[int, List[str]] = {}
+    for expert_id, n in increments.items():
+        by_amount.setdefault(n, []).append(expert_id)
     try:
+        now = django_timezone.now()
         with transaction.atomic():
-            exp = DjangoExpert.objects.select_for_update().get(id=expert_id)
-            exp.current_load = int(exp.current_load or 0) + 1
-            exp.save(update_fields=["current_load"])
+            for n, expert_ids in by_amount.items():
+                DjangoExpert.objects.filter(id__in=expert_ids).update(
+                    current_load=Greatest(F("current_load") + n, Value(0)), updated_at=now
+                )
     except Exception:
-        # Silent no-op if DB not available or expert not found
-        pass
+        # Silent no-op if DB not available
+        return
+    EXPERTS.invalidate()
+
+
+def append_issue(issue: Issue) -> None: # New issues are a single append/insert
+    STORE.append(issue)
+
+
+def compact_issues_impl() -> Dict[str, int]:
+    """
+    Fold journaled updates into the store and move closed issues into the
+    archive (see ARCHIVE_CLOSED). Works the same for either backend.
+    """
+    with issue_store.ArchiveWriter(PROBLEMS_FILE) as archive:
+        target = archive if ARCHIVE_CLOSED else None
+        kept = STORE.rewrite(lambda issue: issue_store.archive_if_closed(issue, target), before_commit=archive.flush)
+    return {"kept": kept, "archived": archive.count}
 
 
-def load_issues() -> List[Issue]:
-    with open(PROBLEMS_FILE, "r") as f:
-        lines = [l for l in (ln.strip() for ln in f.readlines()) if l]
-    return [parse_issue_line(l) for l in lines] # This function loads the issues from the problems.txt file and returns a list of issues
+def get_issue_impl(issue_id: str) -> Optional[IssueRecord]: # Indexed lookup, then the closed-issue archive
+    issue = STORE.get(issue_id)
+    if issue is None:
+        found = issue_store.search_archive(PROBLEMS_FILE, issue_id=issue_id, limit=1)
+        issue = found[0] if found else None
+    return issue
 
 
-def write_issues(issues: List[Issue]) -> None: # This function writes the issues to the problems.txt file
-    with open(PROBLEMS_FILE, "w") as f:
-        for issue in issues:
-            f.write(serialize_issue(issue) + "\n")
+def _highest_issue_number() -> int:
+    """Highest ISSnnn in use across the issue store, its archive and (if available) the Django Issue table."""
+    highest = max(STORE.max_issue_number(), issue_store.max_issue_number(issue_store.iter_archived(PROBLEMS_FILE)))
+    if _DJANGO_READY:
+        try:
+            highest = max(highest, issue_store.max_issue_number(DjangoIssue.objects.values("issue_id")))
+        except Exception:
+            pass
+    return highest
 
 
-def generate_next_issue_id(issues: List[Issue]) -> str: # This function generates the next issue id
-    max_num = 0
-    for issue in issues:
-        iid = issue.get("issue_id") or ""
-        m = re.match(r"^ISS(\d+)$", iid)
-        if m:
-            try:
-                num = int(m.group(1))
-                if num > max_num:
-                    max_num = num
-            except ValueError:
-                pass
-    return f"ISS{max_num + 1:03d}"
+def allocate_issue_id() -> str: # O(1) persistent counter shared with Django
+    return issue_store.allocate_issue_id(PROBLEMS_FILE, seed=_highest_issue_number)
 
 
 # -----------------------------
 # Core functions
 # -----------------------------
-def add_issue_impl(employee_id: str, description: str, category: str, subcategory: str, priority: str) -> Issue:
+def add_issue_impl(employee_id: str, description: str, category: str, subcategory: str, priority: str) -> IssueRecord:
     ensure_problems_file()
-    issues = load_issues() # This function loads the issues from the problems.txt file and returns a list of issues
-    new_id = generate_next_issue_id(issues)
+    new_id = allocate_issue_id()
     now = datetime.now().strftime("%Y-%m-%d %H:%M:%S") # This is the current date and time
-    issue: Issue = {
-        "issue_id": new_id,
-        "employee_id": employee_id.strip(),
-        "description": description.strip(),
-        "category": (category or "").strip().lower(),
-        "subcategory": (subcategory or "").strip().lower(),
-        "priority": (priority or "medium").strip().lower(),
-        "status": "open",
-        "assigned_expert_id": "",
-        "ai_solution": "",
-        "created_at": now,
-        "updated_at": now,
-    }
-    issues.append(issue)
-    write_issues(issues)
+    issue = IssueRecord(
+        issue_id=new_id,
+        employee_id=employee_id.strip(),
+        description=description.strip(),
+        category=(category or "").strip().lower(),
+        subcategory=(subcategory or "").strip().lower(),
+        priority=(priority or "medium").strip().lower(),
+        status="open",
+        created_at=now,
+        updated_at=now,
+    )
+    append_issue(issue)
     print(f"[IT-HELPDESK] Added issue {new_id} for employee {employee_id}", file=sys.stderr)
     return issue
 
 
-def ai_try_solve_impl(issue: Issue) -> Tuple[bool, str]:
-    description = (issue.get("description") or "").lower()
+def keyword_hits(description: str) -> FrozenSet[str]: # One scan of the text (classification_rules.json), memoized; reuse it for classify + solve
+    return classification_rules.cached_hits(description or "")
+
+
+def ai_try_solve_impl(issue: Issue, hits: Optional[FrozenSet[str]] = None) -> Tuple[bool, str]:
+    if hits is None:
+        hits = keyword_hits(issue.get("description") or "")
     category = (issue.get("category") or "").lower()
     subcategory = (issue.get("subcategory") or "").lower()
     priority = (issue.get("priority") or "medium").lower()
@@ -219,20 +248,21 @@ def ai_try_solve_impl(issue: Issue) -> Tuple[bool, str]:
     if priority in {"high", "critical"}:
         return False, "High/critical öncelik: insan uzman incelemesi gerekli."
 
-    if category == "hardware" or any(k in description for k in ["don", "donuyor", "yavaş", "ısın", "lag", "freeze", "slow"]):
+    rules = classification_rules.get_rules()
+    if category == "hardware" or rules.hint("performance", hits):
         solution = (
             "Yeniden başlatın, arka plan uygulamalarını kapatın, disk doluluğunu ve güncellemeleri kontrol edin. "
             "Sorun sürerse donanım tanılama çalıştırın."
         )
         return True, solution
 
-    if category == "software" or subcategory in {"login", "password"} or any(k in description for k in ["şifre", "parola", "giriş", "login", "password"]):
+    if category == "software" or subcategory in {"login", "password"} or rules.hint("login", hits):
         solution = (
             "Parolayı sıfırlayın veya tek seferlik kodla giriş yapın. Tarayıcı önbelleğini temizleyin ve VPN/proxy ayarlarını kontrol edin."
         )
         return True, solution
 
-    if category == "network" or any(k in description for k in ["wifi", "ağ", "vpn", "bağlanm", "internet"]):
+    if category == "network" or rules.hint("network", hits):
         solution = (
             "Modemi/router'ı yeniden başlatın, kabloları kontrol edin, farklı bir ağ deneyin ve VPN ayarlarını doğrulayın."
         )
@@ -241,87 +271,231 @@ def ai_try_solve_impl(issue: Issue) -> Tuple[bool, str]:
     return False, "İnsan uzman ataması gerekiyor."
 
 
-def ai_classify_issue(description: str) -> Tuple[str, str]:
+def ai_classify_issue(description: str, hits: Optional[FrozenSet[str]] = None) -> Tuple[str, str]:
     """
     Classify free-text description into standardized (category, subcategory)
     that align with our experts' expertise labels.
     """
-    text = (description or "").lower()
-
-    # Network
-    if any(k in text for k in ["wifi", "wi-fi", "ağ", "internet", "vpn", "bağlanm", "dns", "proxy", "lan", "wan"]):
-        if "vpn" in text:
-            return "network", "vpn"
-        if any(k in text for k in ["wifi", "wi-fi", "kablosuz"]):
-            return "network", "wifi"
-        return "network", "connectivity"
-
-    # Software
-    if any(k in text for k in ["şifre", "parola", "login", "giriş", "oturum", "uygulama", "program", "kurulum", "installation", "update"]):
-        if any(k in text for k in ["şifre", "parola", "password", "reset"]):
-            return "software", "password"
-        if any(k in text for k in ["login", "giriş", "oturum"]):
-            return "software", "login"
-        return "software", "application"
-
-    # Hardware / Performance
-    if any(k in text for k in ["don", "donuyor", "yavaş", "ısın", "fan", "gürültü", "disk", "ssd", "ram", "ekran", "klavye", "mouse", "keyboard", "freeze", "slow", "lag"]):
-        if any(k in text for k in ["don", "donuyor", "yavaş", "freeze", "slow", "lag"]):
-            return "hardware", "performance"
-        return "hardware", "device"
-
-    # Default fallback
-    return "software", "general"
-
-
-def choose_expert(category: str, subcategory: str, experts: List[Dict]) -> Optional[Dict]:
-    category = (category or "").lower()
-    subcategory = (subcategory or "").lower()
-    candidates = [e for e in experts if e.get("availability")]
-    if not candidates:
-        return None
-    def is_match(exp: Dict) -> bool:
-        expertise = [str(x).lower() for x in (exp.get("expertise") or [])]
-        return (category in expertise) or (subcategory in expertise)
-    matched = [e for e in candidates if is_match(e)] or candidates
-    return sorted(matched, key=lambda e: int(e.get("current_load", 0)))[0]
-
-
-def process_issues_impl() -> Dict[str, int]:
+    # Rules: "mcp" section of classification_rules.json (first matching category wins)
+    if hits is None:
+        hits = keyword_hits(description)
+    return classification_rules.get_rules().classify("", hits)
+
+
+def _log_throughput(name: str, count: int, started: float) -> None:
+    if LOG_THROUGHPUT and count:
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        per_10k_ms = elapsed_ms / count * 10000
+        print(f"[IT-HELPDESK] {name}: {count} descriptions in {elapsed_ms:.1f} ms ({per_10k_ms:.1f} ms per 10k)", file=sys.stderr)
+
+
+def classify_many(descriptions: Iterable[str]) -> List[Tuple[str, str]]:
+    """ai_classify_issue over a batch: one rules lookup, each text normalized and scanned once."""
+    started = time.perf_counter()
+    rules = classification_rules.get_rules()
+    descriptions = list(descriptions)
+    out = [rules.classify("", hits) for hits in rules.hits_many(descriptions)]
+    _log_throughput("classify_many", len(out), started)
+    return out
+
+
+def solve_many(issues: Iterable[Issue]) -> List[Tuple[bool, str]]:
+    """ai_try_solve_impl over a batch of issues (as they are, without reclassifying)."""
+    started = time.perf_counter()
+    issues = list(issues)
+    all_hits = classification_rules.get_rules().hits_many(i.get("description") or "" for i in issues)
+    out = [ai_try_solve_impl(issue, hits) for issue, hits in zip(issues, all_hits)]
+    _log_throughput("solve_many", len(out), started)
+    return out
+
+
+def _triage(issue: Issue, rules: classification_rules.RuleSet, hits: FrozenSet[str]) -> Tuple[str, str, bool, str]:
+    # classify, then try to solve with the new category: (category, subcategory, resolved, solution)
+    cat, sub = rules.classify("", hits)
+    probe = {"description": issue.get("description"), "category": cat, "subcategory": sub, "priority": issue.get("priority")}
+    return (cat, sub) + ai_try_solve_impl(probe, hits)
+
+
+def _triage_many(issues: List[IssueRecord]) -> List[Tuple[str, str, bool, str]]:
+    started = time.perf_counter()
+    rules = classification_rules.get_rules()
+    all_hits = rules.hits_many(i.get("description") or "" for i in issues)
+    out = [_triage(issue, rules, hits) for issue, hits in zip(issues, all_hits)]
+    _log_throughput("triage_many", len(out), started)
+    return out
+
+
+def choose_expert(category: str, subcategory: str, router: expert_router.ExpertRouter) -> Optional[Dict]:
+    """Least-loaded available expert for the category/subcategory (any available one if nobody matches)."""
+    return router.pick(category, subcategory)
+
+
+ACTIONABLE_STATUSES = ("", "open", "reopen", "reopened")
+
+
+def _process_issue(
+    issue: IssueRecord,
+    now: str,
+    counts: Dict[str, int],
+    archive: Optional[issue_store.ArchiveWriter] = None,
+    verdict: Optional[Tuple[str, str, bool, str]] = None,
+    *,
+    loads: Dict[str, int],
+    router: expert_router.ExpertRouter,
+) -> Optional[IssueRecord]:
+    counts["scanned"] += 1
+    status = (issue.get("status") or "open").lower()
+    if status not in ACTIONABLE_STATUSES:
+        if issue_store.archive_if_closed(issue, archive) is None:
+            # Closed on an earlier run: moved to the compressed archive, out of the hot file
+            counts["archived"] += 1
+            return None
+        counts["skipped"] += 1
+        return issue
+    # Normalize classification based on description to fit standard experts
+    if verdict is None:
+        verdict = _triage(issue, classification_rules.get_rules(), keyword_hits(issue.get("description") or ""))
+    cat, sub, resolved, solution = verdict
+    issue["category"] = cat
+    issue["subcategory"] = sub
+    if resolved:
+        issue["status"] = "closed"
+        issue["ai_solution"] = solution
+        issue["updated_at"] = now
+        counts["closed_by_ai"] += 1
+    else:
+        expert = choose_expert(issue.get("category", ""), issue.get("subcategory", ""), router)
+        if expert:
+            issue["status"] = "assigned"
+            issue["assigned_expert_id"] = expert.get("id", "")
+            # Count it now so the next pick in this run sees it; the DB is updated once per run (apply_expert_loads)
+            router.add_load(issue["assigned_expert_id"])
+            loads[issue["assigned_expert_id"]] = loads.get(issue["assigned_expert_id"], 0) + 1
+        else:
+            issue["status"] = dispatch_queue.QUEUED
+        issue["updated_at"] = now
+        if issue["status"] == dispatch_queue.QUEUED:
+            DISPATCH.push(issue)  # assigned by dispatch_queued() once someone has room
+        counts["assigned"] += 1
+    counts["changed"] += 1
+    return issue
+
+
+def _process_pending(now: str, counts: Dict[str, int], loads: Dict[str, int], router: expert_router.ExpertRouter) -> None:
+    # Only issues appended/changed since the last run (or still open) are read; only changed ones are written back.
+    # Writers are kept out until the commit so a status change made meanwhile is not overwritten.
+    with STORE.locked():
+        pending, scanned, token = STORE.pending(*ACTIONABLE_STATUSES)
+        changed, still_open = [], []
+        # pending() only returns actionable issues, so the whole batch is triaged in one pass
+        for issue, verdict in zip(pending, _triage_many(pending)):
+            before = issue.copy()
+            issue = _process_issue(issue, now, counts, verdict=verdict, loads=loads, router=router)
+            if issue != before:
+                changed.append(issue)
+            if (issue.get("status") or "open").lower() in ACTIONABLE_STATUSES:
+                still_open.append(issue["issue_id"])
+        STORE.commit_pending(token, changed, still_open)
+    counts["scanned"] = scanned
+
+
+def process_issues_impl(full: bool = False) -> Dict[str, int]:
+    """
+    Classify, auto-solve and assign open issues.
+
+    By default only open issues and records added since the previous run are
+    looked at. full=True streams the whole store instead and also moves issues
+    closed on earlier runs into the archive (see ARCHIVE_CLOSED).
+    """
     ensure_problems_file()
-    issues = load_issues()
-    counts = {"closed_by_ai": 0, "assigned": 0, "skipped": 0}
+    counts = {"closed_by_ai": 0, "assigned": 0, "skipped": 0, "archived": 0, "scanned": 0, "changed": 0}
+    # Held for the run so a dispatch tick never drains issues this run queued but has not stored yet
+    with DISPATCH.lock:
+        # Issues already waiting go first (priority, then age) if capacity freed up since they were queued
+        counts["dispatched"] = dispatch_queued()
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        loads: Dict[str, int] = {}  # expert id -> issues assigned in this run
+        # One router for the whole run: loads grow as issues are assigned, so a backlog is spread
+        # across equally skilled experts (weighted, up to their capacity) instead of piling onto one
+        router = EXPERTS.router()
+
+        if not full:
+            _process_pending(now, counts, loads, router)
+        else:
+            # Streamed through the backend (temp file + atomic rename, or one SQLite transaction); memory stays flat.
+            # Archive segments are flushed before the hot store drops the archived issues.
+            with issue_store.ArchiveWriter(PROBLEMS_FILE) as archive:
+                target = archive if ARCHIVE_CLOSED else None
+                STORE.rewrite(lambda issue: _process_issue(issue, now, counts, target, loads=loads, router=router), before_commit=archive.flush)
+        # One transaction for the whole run's load bumps, after the issues themselves are stored
+        apply_expert_loads(loads)
+    print(f"[IT-HELPDESK] Processed issues summary: {counts}", file=sys.stderr)
+    return counts
+
+
+def update_issue_status_impl(issue_id: str, status: str) -> Optional[IssueRecord]:
     now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    # Released before dispatch_queued(), which takes DISPATCH.lock first and then the store
+    with STORE.locked():
+        before = STORE.get(issue_id)
+        if before is None:
+            # Archived (closed/resolved) issues go back into the hot store, e.g. to be reopened;
+            # get_issue finds the hot copy first from then on
+            found = issue_store.search_archive(PROBLEMS_FILE, issue_id=(issue_id or "").strip(), limit=1)
+            if found:
+                before = found[0]
+                STORE.append(before)
+        issue = STORE.patch(issue_id, status=(status or "open").strip().lower(), updated_at=now)
+    if issue:
+        print(f"[IT-HELPDESK] Issue {issue_id} status -> {issue.get('status')}", file=sys.stderr)
+        expert_id = (before or {}).get("assigned_expert_id") or ""
+        was_busy = before is not None and (before.get("status") or "").lower() in BUSY_STATUSES
+        if expert_id and was_busy and issue.get("status") not in BUSY_STATUSES:
+            # The expert has room again: release the load and hand out the next queued issue
+            EXPERTS.router().add_load(expert_id, -1)
+            apply_expert_loads({expert_id: -1})
+            dispatch_queued()
+    return issue
 
-    for issue in issues:
-        status = (issue.get("status") or "open").lower()
-        if status not in {"", "open", "reopen", "reopened"}:
-            counts["skipped"] += 1
-            continue
-        # Normalize classification based on description to fit standard experts
-        cat, sub = ai_classify_issue(issue.get("description", ""))
-        issue["category"] = cat
-        issue["subcategory"] = sub
-        resolved, solution = ai_try_solve_impl(issue)
-        if resolved:
-            issue["status"] = "closed"
-            issue["ai_solution"] = solution
-            issue["updated_at"] = now
-            counts["closed_by_ai"] += 1
-        else:
-            expert = choose_expert(issue.get("category", ""), issue.get("subcategory", ""), EXPERTS_CACHE)
-            if expert:
+
+def dispatch_queued() -> int:
+    """Assign queued issues, highest priority and oldest first, while any expert has room."""
+    with DISPATCH.lock:
+        # Re-seeded every time so issues queued by other processes (web agent, Django's MCP calls) are seen
+        DISPATCH.load(STORE.by_status(dispatch_queue.QUEUED))
+        if not len(DISPATCH):
+            return 0
+        # Writers wait until the assignments are stored, so an issue closed meanwhile is not reassigned
+        with STORE.locked():
+            placed = DISPATCH.drain(EXPERTS.router(), STORE.get)
+            if not placed:
+                return 0
+            now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            loads: Dict[str, int] = {}
+            for issue, expert in placed:
                 issue["status"] = "assigned"
                 issue["assigned_expert_id"] = expert.get("id", "")
-                mark_expert_assigned(issue["assigned_expert_id"])  # best-effort bump
-            else:
-                issue["status"] = "queued"
-            issue["updated_at"] = now
-            counts["assigned"] += 1
+                issue["updated_at"] = now
+                loads[issue["assigned_expert_id"]] = loads.get(issue["assigned_expert_id"], 0) + 1
+            STORE.bulk_update(issue for issue, _ in placed)
+        apply_expert_loads(loads)
+    print(f"[IT-HELPDESK] Dispatched {len(placed)} queued issue(s); {len(DISPATCH)} still queued", file=sys.stderr)
+    return len(placed)
+
+
+def _dispatch_ticker() -> None:
+    # Picks up capacity freed outside this process (Django edits to availability/load/capacity)
+    while True:
+        time.sleep(DISPATCH_TICK_SECONDS)
+        try:
+            dispatch_queued()
+        except Exception as e:
+            print(f"[IT-HELPDESK] Dispatch tick failed: {e}", file=sys.stderr)
 
-    write_issues(issues)
-    print(f"[IT-HELPDESK] Processed issues summary: {counts}", file=sys.stderr)
-    return counts
+
+def start_dispatch_ticker() -> None:
+    if DISPATCH_TICK_SECONDS > 0:
+        threading.Thread(target=_dispatch_ticker, name="dispatch-tick", daemon=True).start()
 
 
 # -----------------------------
@@ -367,35 +541,127 @@ def assign_expert(description: str) -> str:
     and choose the most suitable available expert.
     """
     category, subcategory = ai_classify_issue(description)
-    expert = choose_expert(category, subcategory, EXPERTS_CACHE)
+    expert = choose_expert(category, subcategory, EXPERTS.router())
     if not expert:
         return "Uygun uzman bulunamadı"
     return f"Assigned expert: {expert.get('id')} - {expert.get('name')} ({category}/{subcategory})"
 
 
 @mcp.tool()
-def process_issues() -> str:
+def get_issue(issue_id: str) -> str:
+    """
+    Fetch a single issue by its ID
+    @param issue_id: The issue ID, e.g. ISS001
+    @return: The issue fields as JSON, or a not-found message
+    """
+    issue = get_issue_impl(issue_id)
+    if not issue:
+        return f"Issue not found: {issue_id}"
+    return json.dumps(issue.to_dict(), ensure_ascii=False)
+
+
+@mcp.tool()
+def update_issue_status(issue_id: str, status: str) -> str:
+    """
+    Change the status of a single issue without rewriting problems.txt (an archived issue is brought back first)
+    @param issue_id: The issue ID, e.g. ISS001
+    @param status: The new status (open, assigned, queued, closed, ...)
+    @return: Confirmation or a not-found message
+    """
+    issue = update_issue_status_impl(issue_id, status)
+    if not issue:
+        return f"Issue not found: {issue_id}"
+    return f"Issue {issue.get('issue_id')} status: {issue.get('status')}"
+
+
+@mcp.tool()
+def process_issues(full: bool = False) -> str:
     """
     This tool is used to process the issues
+    @param full: Scan every stored issue and archive closed ones instead of only new/open issues
     @return: The summary of the issues
     """
-    counts = process_issues_impl()
-    return f"Closed by AI: {counts['closed_by_ai']}, Assigned/Queued: {counts['assigned']}, Skipped: {counts['skipped']}"
+    counts = process_issues_impl(full=full)
+    return (
+        f"Closed by AI: {counts['closed_by_ai']}, Assigned/Queued: {counts['assigned']}, "
+        f"Skipped: {counts['skipped']}, Archived: {counts['archived']}, "
+        f"Scanned: {counts['scanned']}, Changed: {counts['changed']}, Dispatched from queue: {counts['dispatched']}"
+    )
+
+
+@mcp.tool()
+def compact_issues() -> str:
+    """
+    Fold journaled updates into problems.txt and archive closed issues now
+    (also done automatically once the journal reaches HELPDESK_JOURNAL_COMPACT_BYTES)
+    @return: How many issues were kept and how many archived
+    """
+    counts = compact_issues_impl()
+    return f"Compacted: {counts['kept']} issue(s) kept, {counts['archived']} archived"
+
+
+@mcp.tool()
+def search_archive(query: str = "", issue_id: str = "", employee_id: str = "") -> str:
+    """
+    Search closed issues that were moved to the archive
+    @param query: Text to look for in the description or AI solution (case-insensitive)
+    @param issue_id: Exact issue ID, e.g. ISS001
+    @param employee_id: Exact employee ID
+    @return: Matching archived issues as a JSON list (newest last, at most 20)
+    """
+    found = issue_store.search_archive(PROBLEMS_FILE, query=query, issue_id=issue_id, employee_id=employee_id, limit=20)
+    if not found:
+        return "No archived issues found"
+    return json.dumps([i.to_dict() for i in found], ensure_ascii=False)
+
+
+@mcp.tool()
+def reload_classification_rules() -> str:
+    """
+    Reload classification_rules.json immediately (changes are also picked up automatically)
+    @return: The rules file and version now in use
+    """
+    rules = classification_rules.reload_rules()
+    return f"Classification rules loaded from {rules.source} (version {rules.version})"
+
+
+@mcp.tool()
+def dispatch_queued_issues() -> str:
+    """
+    Assign queued issues now (highest priority and oldest first) to experts with free capacity.
+    Also happens automatically when an assigned issue is closed and every HELPDESK_DISPATCH_TICK_SECONDS
+    @return: How many were assigned and the queue statistics as JSON
+    """
+    dispatched = dispatch_queued()
+    return json.dumps({"dispatched_now": dispatched, **DISPATCH.stats()})
+
+
+@mcp.tool()
+def classification_cache_stats() -> str:
+    """
+    Hit/miss counters of the classification memo (size it with HELPDESK_CLASSIFY_CACHE_SIZE / _TTL)
+    @return: Cache statistics as JSON
+    """
+    return json.dumps(classification_rules.cache_stats())
 
 
 # -----------------------------
 # Startup initialization
 # -----------------------------
 ensure_problems_file()
-EXPERTS_CACHE: List[Dict] = load_experts()
+# Expert list + routing heaps, reloaded when experts_stamp() changes (see expert_router.py)
+EXPERTS = expert_router.ExpertDirectory(load_experts, experts_stamp, EXPERTS_CHECK_SECONDS)
+# "queued" issues by priority and age, assigned as capacity frees up (see dispatch_queue.py)
+DISPATCH = dispatch_queue.DispatchQueue()
 try:
-    num_issues = len(load_issues())
+    num_issues = len(STORE)
 except Exception:
     num_issues = 0
-print(f"[IT-HELPDESK] Server starting. Issues: {num_issues}, Experts: {len(EXPERTS_CACHE)}", file=sys.stderr)
+print(f"[IT-HELPDESK] Server starting. Issues: {num_issues} ({STORE.name}), Experts: {len(EXPERTS.router())}", file=sys.stderr)
 
 
 if __name__ == "__main__":
+    start_dispatch_ticker()
     # STDIO mode for Fast Agent
     mcp.run()
 
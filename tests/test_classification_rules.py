@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+import classification_rules
+
+RULES = {
+    "version": 2,
+    "mcp": {
+        "categories": [
+            {"category": "network", "keywords": ["vpn", "wifi"], "default_subcategory": "connectivity",
+             "subcategories": [{"subcategory": "vpn", "keywords": ["vpn"]}]},
+            {"category": "printing", "keywords": ["printer"]},
+        ],
+        "default": ["software", "other"],
+        "solution_hints": {"restart": ["restart"]},
+    },
+    "django": {
+        "it_check": {"reject": ["lunch"], "accept": ["vpn", "printer", "laptop"]},
+        "categories": [{"category": "network", "keywords": ["vpn"]}],
+        "default_category": "hardware",
+    },
+    "web_agent": {
+        "priorities": [{"priority": "urgent", "keywords": ["outage"]}, {"priority": "high", "keywords": ["vpn"]}],
+        "default_priority": "low",
+        "intents": {"status": ["status of"]},
+    },
+}
+
+
+@pytest.fixture
+def active_rules(monkeypatch):
+    # reload_rules swaps module globals; put the real rules back afterwards
+    for name in ("_rules", "_stamp", "_checked"):
+        monkeypatch.setattr(classification_rules, name, getattr(classification_rules, name))
+    yield
+    classification_rules.CACHE.clear()
+
+
+def test_rule_table_answers_every_consumer():
+    rules = classification_rules.RuleSet(RULES)
+    assert rules.version == 2
+    assert rules.classify("VPN will not connect") == ("network", "vpn")
+    assert rules.classify("wifi drops") == ("network", "connectivity")
+    assert rules.classify("printer jams") == ("printing", "general")
+    assert rules.classify("something odd") == rules.mcp_default == ("software", "other")
+    hits = rules.hits("Please restart the VPN, status of ticket? outage")
+    assert rules.hint("restart", hits) and rules.intent("status", hits)
+    assert rules.priority("", hits) == "urgent"
+    assert rules.priority("vpn slow") == "high"
+    assert rules.is_it_issue("laptop is broken")
+    assert not rules.is_it_issue("lunch order for the laptop team")
+    assert rules.infer_category("vpn down") == "network"
+    assert rules.infer_category("laptop is broken") == "hardware"
+
+
+def test_reload_swaps_rules_and_keeps_them_on_a_bad_file(tmp_path, active_rules):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps(RULES), encoding="utf-8")
+    loaded = classification_rules.reload_rules(str(path))
+    assert classification_rules.get_rules() is loaded
+    assert classification_rules.cached_hits("VPN down") == loaded.hits("vpn down")
+
+    path.write_text("{not json", encoding="utf-8")
+    assert classification_rules.reload_rules(str(path)) is loaded
+
+
+def test_cache_key_matches_matcher_normalisation():
+    # casefold() folds "ß" to "ss"; the matcher only lower-cases, so these must not share an entry
+    assert classification_rules.normalize_text("Straße") != classification_rules.normalize_text("STRASSE")
+    assert classification_rules.normalize_text("  VPN   down\t") == "vpn down"
+    rules = classification_rules.get_rules()
+    classification_rules.CACHE.clear()
+    for text in ("Straße yazıcı", "STRASSE yazıcı", "My VPN  keeps dropping"):
+        assert classification_rules.cached_hits(text) == rules.hits(text)
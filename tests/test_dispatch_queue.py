@@ -0,0 +1,34 @@
+import dispatch_queue
+from expert_router import ExpertRouter
+
+
+def queued(issue_id: str, priority: str, created_at: str) -> dict:
+    return {"issue_id": issue_id, "status": "queued", "priority": priority, "created_at": created_at,
+            "category": "network", "subcategory": ""}
+
+
+def test_drain_goes_by_priority_then_age_and_stops_when_nobody_has_room():
+    store = {i["issue_id"]: i for i in [
+        queued("ISS1", "low", "2025-01-01 08:00:00"),
+        queued("ISS2", "high", "2025-01-02 08:00:00"),
+        queued("ISS3", "urgent", "2025-01-03 08:00:00"),
+        queued("ISS4", "high", "2025-01-01 09:00:00"),
+        queued("ISS5", "", "2024-12-01 08:00:00"),  # unknown priority goes last
+        queued("ISS6", "medium", "2025-01-01 10:00:00"),
+    ]}
+    router = ExpertRouter([{"id": "E1", "expertise": ["network"], "availability": True, "current_load": 0, "capacity": 3}])
+    queue = dispatch_queue.DispatchQueue()
+    queue.load(store.values())
+    queue.load(store.values())  # re-seeding keeps each id once
+    assert len(queue) == 6
+
+    store["ISS3"]["status"] = "closed"  # closed while waiting: dropped, not assigned
+    placed = queue.drain(router, store.get)
+    assert [issue["issue_id"] for issue, _ in placed] == ["ISS4", "ISS2", "ISS6"]
+    assert router.get("E1")["current_load"] == 3
+    assert queue.stats()["next_issue_id"] == "ISS1"
+    assert queue.drain(router, store.get) == []  # head cannot be placed: strict order kept
+
+    router.add_load("E1", -1)
+    assert [issue["issue_id"] for issue, _ in queue.drain(router, store.get)] == ["ISS1"]
+    assert (len(queue), queue.dispatched) == (1, 4)
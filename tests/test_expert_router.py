@@ -0,0 +1,83 @@
+import sys
+import threading
+
+import pytest
+
+from expert_router import ExpertRouter
+
+
+def make_experts(n: int):
+    return [
+        {"id": str(i), "expertise": ["network" if i % 2 else "hardware"], "availability": True, "current_load": 0}
+        for i in range(n)
+    ]
+
+
+@pytest.mark.parametrize("round_", range(3))
+def test_concurrent_pick_and_load(round_):
+    router = ExpertRouter(make_experts(8))
+    misses, errors = [], []
+
+    def worker():
+        try:
+            for k in range(20000):
+                expert = router.pick("network" if k % 2 else "hardware", "")
+                if expert is None:
+                    misses.append(k)
+                    continue
+                router.add_load(expert["id"])
+                router.add_load(expert["id"], -1)
+        except Exception as e:  # surfaced by the assert below
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(6)]
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)  # interleave the heap updates as much as possible
+    try:
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(30)
+    finally:
+        sys.setswitchinterval(interval)
+    assert not errors and not misses
+    assert [e["current_load"] for e in router.experts()] == [0] * 8
+    assert router.pick("network", "") is not None and router.pick("hardware", "") is not None
+
+
+def test_pick_prefers_least_loaded_expert_with_the_tag():
+    router = ExpertRouter([
+        {"id": "a", "expertise": ["Network"], "availability": True, "current_load": 2},
+        {"id": "b", "expertise": ["network", "vpn"], "availability": True, "current_load": 1},
+        {"id": "c", "expertise": ["hardware"], "availability": True, "current_load": 0},
+        {"id": "d", "expertise": ["network"], "availability": False, "current_load": 0},
+    ])
+    assert router.pick("network", "")["id"] == "b"
+    assert router.pick("printing", "vpn")["id"] == "b"  # subcategory tag counts too
+    assert router.pick("printing", "")["id"] == "c"  # nobody specialises: least loaded overall
+    router.update("d", availability=True)
+    assert router.pick("network", "")["id"] == "d"
+
+
+def test_add_load_rotates_by_weight_and_respects_capacity():
+    router = ExpertRouter([
+        {"id": "a", "expertise": ["network"], "availability": True, "current_load": 0, "weight": 2},
+        {"id": "b", "expertise": ["network"], "availability": True, "current_load": 0, "capacity": 1},
+    ])
+    picks = []
+    for _ in range(4):
+        expert = router.pick("network", "")
+        picks.append(expert["id"])
+        router.add_load(expert["id"])
+    assert picks == ["a", "b", "a", "a"]  # b is full after one
+    router.update("a", availability=False)
+    assert router.pick("network", "") is None
+
+
+def test_release_never_goes_below_zero():
+    router = ExpertRouter(make_experts(2))
+    router.add_load("0", -1)
+    assert router.get("0")["current_load"] == 0
+    router.add_load("0", 2)
+    router.add_load("0", -3)
+    assert router.get("0")["current_load"] == 0
@@ -0,0 +1,37 @@
+import threading
+
+import issue_backends
+
+from test_issue_store import make_issue
+
+
+def test_file_backend_keeps_patch_made_during_pending_run(tmp_path):
+    store = issue_backends.FlatFileBackend(str(tmp_path / "problems.txt"))
+    store.replace_all([make_issue(1)])
+    read = threading.Event()
+    patched = []
+    patcher = threading.Thread(
+        target=lambda: (read.wait(), patched.append(store.patch("ISS-0001", status="closed", updated_at="later"))),
+        daemon=True,
+    )
+    patcher.start()
+    with store.locked():
+        pending, _, token = store.pending("open")
+        read.set()
+        patcher.join(0.2)
+        assert patcher.is_alive()  # kept out until the commit
+        issue = dict(pending[0], status="assigned", ai_solution="", updated_at="run")
+        store.commit_pending(token, [issue], [])
+    patcher.join(10)
+    assert patched and store.get("ISS-0001")["status"] == "closed"
+
+
+def test_sqlite_backend_skips_rows_changed_since_pending(tmp_path):
+    store = issue_backends.SQLiteBackend(str(tmp_path / "issues.sqlite3"))
+    store.replace_all([make_issue(1), make_issue(2)])
+    pending, _, token = store.pending("open")
+    store.patch("ISS-0001", status="closed", updated_at="later")
+    changed = [dict(i, status="assigned", updated_at="run") for i in pending]
+    assert store.commit_pending(token, changed, []) == 1
+    assert store.get("ISS-0001")["status"] == "closed"
+    assert store.get("ISS-0002")["status"] == "assigned"
@@ -0,0 +1,223 @@
+import threading
+
+import issue_store
+
+
+def make_issue(n: int, status: str = "open") -> dict:
+    return {
+        "issue_id": f"ISS-{n:04d}",
+        "status": status,
+        "description": f"issue {n}",
+        "created_at": "2025-01-01 00:00:00",
+        "updated_at": "2025-01-01 00:00:00",
+    }
+
+
+def run_threads(targets, timeout=20.0):
+    errors = []
+
+    def guard(fn):
+        def run():
+            try:
+                fn()
+            except BaseException as e:  # surfaced by the assert below
+                errors.append(e)
+        return run
+
+    threads = [threading.Thread(target=guard(t), daemon=True) for t in targets]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout)
+    assert not any(t.is_alive() for t in threads), "writers deadlocked"
+    assert not errors, errors
+
+
+def test_concurrent_append_and_patch(tmp_path):
+    path = str(tmp_path / "problems.txt")
+    issue_store.write_issues(path, [make_issue(n) for n in range(1, 11)])
+
+    def appender(start):
+        def run():
+            for n in range(start, start + 50):
+                issue_store.append_issue(path, make_issue(n))
+        return run
+
+    def patcher(status):
+        def run():
+            for _ in range(50):
+                for n in range(1, 11):
+                    issue_store.patch_issue(path, f"ISS-{n:04d}", status=status)
+        return run
+
+    run_threads([appender(100), appender(200), appender(300), patcher("assigned"), patcher("in_progress")])
+
+    issues = {i["issue_id"]: i for i in issue_store.iter_issues(path)}
+    assert len(issues) == 160
+    assert all(issues[f"ISS-{n:04d}"]["status"] in ("assigned", "in_progress") for n in range(1, 11))
+    for n in range(1, 11):
+        assert issue_store.get_issue(path, f"ISS-{n:04d}")["status"] == issues[f"ISS-{n:04d}"]["status"]
+
+
+def test_updates_go_to_the_journal_until_compaction(tmp_path):
+    path = str(tmp_path / "problems.txt")
+    issue_store.write_issues(path, [make_issue(1), make_issue(2)])
+    issue_store.append_issue(path, make_issue(3))
+    with open(path, encoding="utf-8") as f:
+        main_before = f.read()
+    assert main_before.count("\n") == 3
+
+    issue_store.journal_update(path, dict(make_issue(2), status="assigned"))
+    issue_store.patch_issue(path, "ISS-0002", assigned_expert_id="EXP-1")
+    issue_store.patch_issue(path, "ISS-0003", status="in_progress")
+
+    with open(path, encoding="utf-8") as f:
+        assert f.read() == main_before  # updates never rewrite the main file
+    merged = {i["issue_id"]: i for i in issue_store.iter_issues(path)}
+    assert [i["issue_id"] for i in issue_store.load_issues(path)] == ["ISS-0001", "ISS-0002", "ISS-0003"]
+    assert (merged["ISS-0002"]["status"], merged["ISS-0002"]["assigned_expert_id"]) == ("assigned", "EXP-1")
+    assert merged["ISS-0003"]["status"] == "in_progress"
+
+    assert issue_store.compact(path) == 3
+    assert not issue_store.os.path.exists(issue_store.journal_path(path))
+    assert {i["issue_id"]: i for i in issue_store.iter_issues(path)} == merged
+    assert issue_store.compact(path) == 0  # nothing journaled since
+
+
+def test_group_commit_batches_concurrent_appends(tmp_path, monkeypatch):
+    path = str(tmp_path / "problems.txt")
+    issue_store.write_issues(path, [])
+    monkeypatch.setattr(issue_store, "GROUP_COMMIT_WINDOW_MS", 50)  # leader waits so the others join its batch
+    writer = issue_store.get_writer(path)
+    start = threading.Barrier(8)
+
+    def appender(n):
+        def run():
+            start.wait()
+            issue_store.append_issue(path, make_issue(n))
+        return run
+
+    run_threads([appender(n) for n in range(1, 9)])
+
+    assert writer.records == 8
+    assert writer.batches < 8
+    assert sorted(i["issue_id"] for i in issue_store.iter_issues(path)) == [f"ISS-{n:04d}" for n in range(1, 9)]
+    for n in range(1, 9):
+        assert issue_store.get_issue(path, f"ISS-{n:04d}")["description"] == f"issue {n}"
+
+
+def test_index_reads_appends_and_journal_without_reloading(tmp_path, monkeypatch):
+    path = str(tmp_path / "problems.txt")
+    issue_store.write_issues(path, [make_issue(1), make_issue(2)])
+    index = issue_store.get_index(path)
+    assert [i["issue_id"] for i in index.with_status("open")] == ["ISS-0001", "ISS-0002"]
+
+    reloads = []
+    full_reload = issue_store.IssueIndex._full_reload
+
+    def counting_reload(self, *args):
+        reloads.append(args)
+        full_reload(self, *args)
+
+    monkeypatch.setattr(issue_store.IssueIndex, "_full_reload", counting_reload)
+    issue_store.append_issue(path, make_issue(3))
+    issue_store.patch_issue(path, "ISS-0001", status="assigned")
+
+    assert [i["issue_id"] for i in index.with_status("open")] == ["ISS-0002", "ISS-0003"]
+    assert [i["issue_id"] for i in index.with_status("assigned")] == ["ISS-0001"]
+    assert index.get("ISS-0003")["description"] == "issue 3"
+    copy = index.get("ISS-0002")
+    copy["status"] = "closed"  # readers get copies
+    assert index.get("ISS-0002")["status"] == "open"
+    assert reloads == []
+
+
+def test_index_sees_repeated_rewrites(tmp_path):
+    path = str(tmp_path / "problems.txt")
+    index = issue_store.get_index(path)
+    issue_store.write_issues(path, [make_issue(n) for n in range(1, 4)])
+    assert len(index.issues()) == 3
+    for size in (5, 6, 8):
+        issue_store.write_issues(path, [make_issue(n, "assigned") for n in range(101, 101 + size)])
+    assert [i["issue_id"] for i in index.issues()] == [f"ISS-{n:04d}" for n in range(101, 109)]
+
+
+def test_index_reloads_rewrite_that_kept_the_inode(tmp_path):
+    # What a rewrite looks like when the filesystem hands the old inode back: same inode, bigger file.
+    path = str(tmp_path / "problems.txt")
+    issue_store.write_issues(path, [make_issue(n) for n in range(1, 4)])
+    index = issue_store.get_index(path)
+    assert len(index.issues()) == 3
+    with issue_store.store_lock(path):
+        with open(path, "w", encoding="utf-8") as f:
+            f.writelines(issue_store.serialize_issue(make_issue(n, "closed")) + "\n" for n in range(201, 206))
+        issue_store._bump_generation(path)
+    assert sorted(i["issue_id"] for i in index.issues()) == [f"ISS-{n:04d}" for n in range(201, 206)]
+    assert issue_store.get_issue(path, "ISS-0001") is None
+    assert issue_store.get_issue(path, "ISS-0203")["status"] == "closed"
+
+
+def test_compaction_archives_closed_issues(tmp_path, monkeypatch):
+    path = str(tmp_path / "problems.txt")
+    issue_store.write_issues(path, [make_issue(n) for n in range(1, 6)])
+    monkeypatch.setattr(issue_store, "JOURNAL_COMPACT_BYTES", 1)  # every journal write compacts
+    issue_store.patch_issue(path, "ISS-0002", status="closed")
+    issue_store.patch_issue(path, "ISS-0004", status="resolved")
+
+    assert not issue_store.os.path.exists(issue_store.journal_path(path))
+    assert [i["issue_id"] for i in issue_store.iter_issues(path)] == ["ISS-0001", "ISS-0003", "ISS-0005"]
+    assert sorted(i["issue_id"] for i in issue_store.iter_archived(path)) == ["ISS-0002", "ISS-0004"]
+    assert issue_store.search_archive(path, issue_id="ISS-0004")[0]["status"] == "resolved"
+
+
+def test_archive_segments_by_month_and_keeps_newest_copy(tmp_path):
+    path = str(tmp_path / "problems.txt")
+    jan = dict(make_issue(1, "closed"), updated_at="2025-01-20 10:00:00")
+    feb = dict(make_issue(2, "resolved"), updated_at="2025-02-03 09:00:00", employee_id="E7")
+    with issue_store.ArchiveWriter(path) as archive:
+        archive.add(jan)
+        archive.add(feb)
+    with issue_store.ArchiveWriter(path) as archive:  # a later run appends a second gzip member
+        archive.add(dict(jan, ai_solution="restart the router"))
+
+    assert issue_store.archive_segments(path) == ["2025-01", "2025-02"]
+    assert [i["issue_id"] for i in issue_store.iter_archived(path, months=["2025-02"])] == ["ISS-0002"]
+    assert len(list(issue_store.iter_archived(path))) == 3
+    assert [i["ai_solution"] for i in issue_store.search_archive(path, issue_id="ISS-0001")] == ["restart the router"]
+    assert [i["issue_id"] for i in issue_store.search_archive(path, query="ROUTER")] == ["ISS-0001"]
+    assert [i["issue_id"] for i in issue_store.search_archive(path, employee_id="E7")] == ["ISS-0002"]
+
+
+def test_compaction_keeps_closed_issues_when_archiving_is_off(tmp_path, monkeypatch):
+    path = str(tmp_path / "problems.txt")
+    issue_store.write_issues(path, [make_issue(1), make_issue(2)])
+    monkeypatch.setattr(issue_store, "ARCHIVE_CLOSED", False)
+    issue_store.patch_issue(path, "ISS-0001", status="closed")
+    assert issue_store.compact(path) == 2
+    assert issue_store.get_issue(path, "ISS-0001")["status"] == "closed"
+    assert list(issue_store.iter_archived(path)) == []
+
+
+def test_pending_issues_reads_only_what_changed_since_the_cursor(tmp_path):
+    path = str(tmp_path / "problems.txt")
+    issue_store.write_issues(path, [make_issue(n) for n in range(1, 6)])
+
+    pending, scanned, cursor = issue_store.pending_issues(path, ["open"])
+    assert (len(pending), scanned) == (5, 5)  # no cursor yet: full index
+    done = [dict(i, status="assigned") for i in pending if i["issue_id"] != "ISS-0005"]
+    issue_store.commit_pending(path, cursor, done, ["ISS-0005"])  # ISS-0005 found no expert
+
+    pending, scanned, cursor = issue_store.pending_issues(path, ["open"])
+    assert [i["issue_id"] for i in pending] == ["ISS-0005"]
+    assert scanned == 1  # the run's own journal records are behind the cursor
+    issue_store.commit_pending(path, cursor, [], ["ISS-0005"])
+
+    issue_store.append_issue(path, make_issue(6))
+    issue_store.patch_issue(path, "ISS-0002", status="open")
+    pending, scanned, cursor = issue_store.pending_issues(path, ["open"])
+    assert sorted(i["issue_id"] for i in pending) == ["ISS-0002", "ISS-0005", "ISS-0006"]
+    assert scanned == 3
+
+    issue_store.write_issues(path, issue_store.load_issues(path))  # a rewrite invalidates the cursor
+    pending, scanned, _ = issue_store.pending_issues(path, ["open"])
+    assert (len(pending), scanned) == (3, 6)
@@ -0,0 +1,62 @@
+import pytest
+
+import issue_backends
+import issue_store
+
+from test_issue_store import make_issue
+
+main = pytest.importorskip("main")
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    path = str(tmp_path / "problems.txt")
+    backend = issue_backends.FlatFileBackend(path)
+    monkeypatch.setattr(main, "PROBLEMS_FILE", path)
+    monkeypatch.setattr(main, "STORE", backend)
+    return backend
+
+
+def test_update_issue_status_reopens_archived_issue(store):
+    store.replace_all([make_issue(1), make_issue(2, "closed")])
+    assert main.compact_issues_impl() == {"kept": 1, "archived": 1}
+    assert store.get("ISS-0002") is None
+    assert main.get_issue_impl("ISS-0002")["status"] == "closed"
+
+    issue = main.update_issue_status_impl("ISS-0002", "reopened")
+    assert issue is not None and issue["status"] == "reopened"
+    assert store.get("ISS-0002")["status"] == "reopened"
+    assert main.get_issue_impl("ISS-0002")["status"] == "reopened"
+    assert main.update_issue_status("ISS-0002", "open") == "Issue ISS-0002 status: open"
+
+
+def test_update_issue_status_unknown_issue(store):
+    store.replace_all([make_issue(1)])
+    assert main.update_issue_status_impl("ISS-0404", "closed") is None
+    assert main.update_issue_status("ISS-0404", "closed") == "Issue not found: ISS-0404"
+
+
+DESCRIPTIONS = [
+    "VPN keeps dropping every few minutes",
+    "  vpn KEEPS dropping   every few minutes ",
+    "Yazıcı kağıt sıkıştırıyor",
+    "Outlook şifremi unuttum, giriş yapamıyorum",
+    "Laptop is very slow after the update",
+    "",
+    "something nobody has a rule for",
+]
+
+
+def test_classify_many_matches_single_calls():
+    assert main.classify_many(iter(DESCRIPTIONS)) == [main.ai_classify_issue(d) for d in DESCRIPTIONS]
+    assert main.classify_many([]) == []
+
+
+def test_solve_many_matches_single_calls():
+    issues = [
+        {"description": d, "category": cat, "subcategory": "", "priority": priority}
+        for d, cat, priority in zip(DESCRIPTIONS, ["network", "", "", "software", "hardware", "", ""],
+                                    ["low", "medium", "high", "", "medium", "low", "low"])
+    ]
+    assert main.solve_many(issues) == [main.ai_try_solve_impl(i) for i in issues]
+    assert [solved for solved, _ in main.solve_many(issues)] == [True, True, False, True, True, False, False]
@@ -83,22 +83,24 @@ class WebAgent:
             # Import MCP tools directly instead of using subprocess
             sys.path.insert(0, self.working_directory)
             from main import ai_classify_issue, ai_try_solve, add_issue, assign_expert
+            import classification_rules
             import requests
             
             # Process the message directly
             user_message = message
             message_lower = user_message.lower().strip()
             
+            # One (memoized) keyword scan answers classification, intents and priority (classification_rules.json)
+            rules = classification_rules.get_rules()
+            hits = classification_rules.cached_hits(message_lower)
+            
             # Use AI to classify the issue
-            category, subcategory = ai_classify_issue(user_message)
+            category, subcategory = ai_classify_issue(user_message, hits)
             
             # Check if AI classified it as a non-technical issue
             if category == "software" and subcategory == "general" and len(message_lower.split()) <= 3:
-                greetings = ['hello', 'hi', 'hey', 'good morning', 'good afternoon', 'good evening', 'thanks', 'thank you', 'bye', 'goodbye', 'selam', 'merhaba']
-                questions = ['how are you', 'what can you do', 'help me', 'what is this', 'who are you', 'nasılsın', 'ne yapabilirsin']
-                
-                is_simple_greeting = any(greeting in message_lower for greeting in greetings)
-                is_simple_question = any(question in message_lower for question in questions)
+                is_simple_greeting = rules.intent("greeting", hits)
+                is_simple_question = rules.intent("question", hits)
                 
                 if is_simple_greeting or is_simple_question:
                     return """👋 Hello! I'm your IT Help Desk Agent. 
@@ -119,11 +121,7 @@ To report a technical problem, please describe:
 How can I help you with a technical issue today?"""
             
             # Check if it's a follow-up request for expert assistance
-            if any(phrase in message_lower for phrase in [
-                'need further assistance', 'assign me with', 'human expert', 'assign expert', 'escalate', 'transfer to',
-                'assign me', 'assign an expert', 'assign me an expert', 'assign to human', 'connect me to human',
-                'talk to human', 'contact an expert', 'assing expert', 'assing human', 'assing me'
-            ]):
+            if rules.intent("escalate", hits):
                 # Load experts and find the best match
                 try:
                     experts_file = os.path.join(self.working_directory, "tech_experts.json")
@@ -209,8 +207,7 @@ I understand you need further assistance with your technical issue.
 Is there anything else I can help you with while you wait for the expert?"""
             
             # Check if it's a general question about capabilities
-            questions = ['how are you', 'what can you do', 'help me', 'what is this', 'who are you', 'nasılsın', 'ne yapabilirsin']
-            if any(question in message_lower for question in questions):
+            if rules.intent("question", hits):
                 return """🤖 I'm an IT Help Desk Agent with access to:
 
 **Available Tools:**
@@ -250,12 +247,7 @@ Your message: "{user_message}"
 Please describe your technical issue with more details so I can help you properly."""
             
             # Determine priority
-            if any(word in message_lower for word in ['urgent', 'critical', 'emergency', 'down', 'broken']):
-                priority = "high"
-            elif any(word in message_lower for word in ['important', 'soon', 'asap']):
-                priority = "medium"
-            else:
-                priority = "low"
+            priority = rules.priority(message_lower, hits)
             
             # Try AI solution first
             ai_solution = ai_try_solve(user_message, category, subcategory, priority)